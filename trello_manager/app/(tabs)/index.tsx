@@ -18,6 +18,77 @@ const MainScreen = () => {
     fetchBoards();
   }, []); // Runs when boardResults changes
 
+  // Keep boards, lists and cards up to date from the server's change events
+  useEffect(() => {
+    let lastSeq: number | null = null;
+    let socket: WebSocket;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(`ws://127.0.0.1:8000/ws${lastSeq !== null ? `?after=${lastSeq}` : ""}`);
+      socket.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        lastSeq = event.seq;
+        applyChange(event);
+      };
+      socket.onclose = () => {
+        if (!closed) setTimeout(connect, 3000); // Reconnect and resume after the last event seen
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      socket.close();
+    };
+  }, []);
+
+  const applyChange = (event: { type: string; change: string; data: any }) => {
+    const item = event.data;
+    const removed = event.change === "deleted" || item?.closed;
+
+    // Replace the item with the same id, or add it when it is new
+    const upsert = (items: any[] = []) =>
+      items.some((i) => i.id === item.id)
+        ? items.map((i) => (i.id === item.id ? { ...i, ...item } : i))
+        : [...items, item];
+    const without = (items: any[] = []) => items.filter((i) => i.id !== item.id);
+
+    if (event.type === "resync") {
+      fetchBoards();
+    } else if (event.type === "board") {
+      setBoardResults((prev) => (removed ? without(prev) : upsert(prev)));
+    } else if (event.type === "list") {
+      setListByBoard((prev) => {
+        const boardId = item.idBoard ?? Object.keys(prev).find((id) => prev[id].some((l) => l.id === item.id));
+        const current = Object.keys(prev).find((id) => prev[id].some((l) => l.id === item.id));
+        // Still on the same board: update it where it is, so a rename doesn't move it to the end
+        if (!removed && boardId && current === boardId) return { ...prev, [boardId]: upsert(prev[boardId]) };
+        const next: { [key: string]: any[] } = {};
+        for (const id of Object.keys(prev)) next[id] = without(prev[id]);
+        if (!removed && boardId) {
+          const existing = current ? prev[current].find((l) => l.id === item.id) : undefined;
+          next[boardId] = [...(next[boardId] ?? []), { ...existing, ...item }];
+        }
+        return next;
+      });
+    } else if (event.type === "card") {
+      setCardsByList((prev) => {
+        const listId = item.idList ?? Object.keys(prev).find((id) => prev[id].some((c) => c.id === item.id));
+        const current = Object.keys(prev).find((id) => prev[id].some((c) => c.id === item.id));
+        // Still in the same list: update it where it is, only a move to another list re-inserts it
+        if (!removed && listId && current === listId) return { ...prev, [listId]: upsert(prev[listId]) };
+        const next: { [key: string]: any[] } = {};
+        for (const id of Object.keys(prev)) next[id] = without(prev[id]);
+        if (!removed && listId) {
+          const existing = current ? prev[current].find((c) => c.id === item.id) : undefined;
+          next[listId] = [...(next[listId] ?? []), { ...existing, ...item }];
+        }
+        return next;
+      });
+    }
+  };
+
   const act = async () => {
     try {
       const response = await fetch("http://127.0.0.1:8000/prompt", {
@@ -40,7 +111,7 @@ const MainScreen = () => {
 
   const fetchBoards = async () => {
     try {
-      const response = await fetch("http://127.0.0.1:8000/getBoards");
+      const response = await fetch("http://127.0.0.1:8000/getBoards?fields=name");
       const data = await response.json();
 
       if (data.boards) {
@@ -63,7 +134,7 @@ const MainScreen = () => {
 
   const fetchListsForBoard = async (boardId: any) => {
     try {
-      const response = await fetch(`http://127.0.0.1:8000/getLists?board_id=${boardId}`);
+      const response = await fetch(`http://127.0.0.1:8000/getLists?board_id=${boardId}&fields=name`);
       const data = await response.json();
 
       if (data.lists) {
@@ -94,7 +165,7 @@ const MainScreen = () => {
 
   const fetchCardbyList = async (listId: any) => {
     try {
-      const response = await fetch(`http://127.0.0.1:8000/getCards?list_id=${listId}`);
+      const response = await fetch(`http://127.0.0.1:8000/getCards?list_id=${listId}&fields=name,desc,due`);
       const data = await response.json();
 
       if (data.cards) {
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from cache import ReadCache
+from ratelimit import RateLimiter
+from singleflight import SingleFlight
+
+# Accounts kept in memory besides the default one; the least recently used is dropped and rebuilt on its next request
+MAX_ACCOUNTS = 200
+
+# The account a request or job acts for; None means the default account from the environment
+current_account = ContextVar("current_account", default=None)
+
+
+def account_id(key, token):
+    """A short, stable id for a key/token pair that doesn't reveal the token."""
+    return hashlib.sha256(f"{key}:{token}".encode()).hexdigest()[:16]
+
+
+class AccountError(Exception):
+    """Trello rejected a key/token pair, so no account is set up for it."""
+
+
+class Account:
+    """One Trello key/token with its own rate limit bucket, read cache, single-flight group and chat history.
+
+    `partition` names the account in events and the change log: None for the default account,
+    so rows written before accounts existed stay with it, and the id for the others.
+    open_history(create) returns the chat history collection, or None when it doesn't exist and
+    create is false, so an account only gets one once it has something to store.
+    """
+
+    def __init__(self, key, token, open_history, cache_ttl, cache_entries, rate, burst, default=False):
+        self.key = key
+        self.token = token
+        self.id = account_id(key, token)
+        self.default = default
+        self.partition = None if default else self.id
+        self.auth = {"key": key, "token": token}
+        self.limiter = RateLimiter(rate, burst)
+        self.reads = SingleFlight()
+        self.cache = ReadCache(cache_ttl, cache_entries)
+        self.snapshot = None  # Columnar snapshot of the account's boards behind /analytics
+        self._open_history = open_history
+        self._history = None
+        self._history_lock = threading.Lock()
+
+    def history(self, create=True):
+        """The account's chat history collection, opened on first use; None if it has none and create is false."""
+        with self._history_lock:
+            if self._history is None:
+                self._history = self._open_history(create)
+            return self._history
+
+
+class AccountRegistry:
+    """The accounts requests have come in for, built by make_account(key, token) on first use.
+
+    make_account raises AccountError for a pair Trello rejects, which is then not registered. The
+    default account is always kept; the others are dropped least recently used first.
+    """
+
+    def __init__(self, default, make_account, max_accounts=MAX_ACCOUNTS):
+        self.default = default
+        self.make_account = make_account
+        self.max_accounts = max_accounts
+        self._lock = threading.Lock()
+        self._accounts = OrderedDict()  # id -> Account
+        self.stats = {"created": 0, "evicted": 0}
+
+    def get(self, key, token):
+        """The account for a key/token pair, creating it when it's new."""
+        if not token or (key == self.default.key and token == self.default.token):
+            return self.default
+        ident = account_id(key, token)
+        with self._lock:
+            account = self._accounts.get(ident)
+            if account:
+                self._accounts.move_to_end(ident)
+                return account
+
+        # Built outside the lock, checking the token with Trello takes a request
+        account = self.make_account(key, token)
+        with self._lock:
+            if ident not in self._accounts:
+                self._accounts[ident] = account
+                self.stats["created"] += 1
+            account = self._accounts[ident]
+            self._accounts.move_to_end(ident)
+            while len(self._accounts) > self.max_accounts:
+                self._accounts.popitem(last=False)
+                self.stats["evicted"] += 1
+        return account
+
+    def find(self, ident):
+        """The loaded account with this id, or None; no id means the default account."""
+        if ident is None or ident == self.default.id:
+            return self.default
+        with self._lock:
+            return self._accounts.get(ident)
+
+    def all(self):
+        with self._lock:
+            return [self.default, *self._accounts.values()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._accounts) + 1
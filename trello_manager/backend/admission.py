@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Lower runs first: deterministic commands and reads, then LLM answers, then background jobs
+PRIORITY_COMMAND = 0
+PRIORITY_ANSWER = 1
+PRIORITY_BACKGROUND = 2
+
+# Priority of the work on this thread or task; background work waits as long as it takes
+current_priority = ContextVar("current_priority", default=PRIORITY_COMMAND)
+
+# Weight of the latest hold time in a pool's average service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """A pool's queue is too long to get a slot within the deadline; retry after `retry_after` seconds."""
+
+    def __init__(self, pool, retry_after):
+        super().__init__(f"The {pool} queue is full, retry in {retry_after} seconds.")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """A fixed number of slots handed out by priority, then arrival order.
+
+    A caller is refused at once when the expected wait, from the queue ahead of it and the pool's
+    average hold time, exceeds its deadline, and refused later if it still waits at the deadline.
+    """
+
+    def __init__(self, name, slots, deadline):
+        self.name = name
+        self.slots = slots
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._free = slots
+        self._waiters = []  # Heap of [priority, arrival, event, granted]
+        self._arrivals = itertools.count()
+        self._service_seconds = 0.0
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def expected_wait(self, priority):
+        """Seconds a caller of this priority would wait for a slot now."""
+        with self._lock:
+            return self._expected_wait(priority)
+
+    def _expected_wait(self, priority):
+        if self._free:
+            return 0.0
+        ahead = sum(1 for waiter in self._waiters if waiter[0] <= priority)
+        return (ahead // self.slots + 1) * self._service_seconds
+
+    def acquire(self, priority, deadline):
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                self.stats["admitted"] += 1
+                return
+            expected = self._expected_wait(priority)
+            if deadline is not None and expected > deadline:
+                self.stats["rejected"] += 1
+                raise Overloaded(self.name, math.ceil(expected))
+            waiter = [priority, next(self._arrivals), threading.Event(), False]
+            heapq.heappush(self._waiters, waiter)
+
+        if waiter[2].wait(deadline):
+            return
+        with self._lock:
+            if waiter[3]:
+                return  # Granted as the deadline passed
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            self.stats["timed_out"] += 1
+        raise Overloaded(self.name, math.ceil(self._service_seconds) or 1)
+
+    def release(self, held_seconds):
+        with self._lock:
+            self._service_seconds += SERVICE_TIME_SMOOTHING * (held_seconds - self._service_seconds)
+            if self._waiters:
+                # Hand the slot straight to the first waiter so nobody can cut in
+                waiter = heapq.heappop(self._waiters)
+                waiter[3] = True
+                waiter[2].set()
+                self.stats["admitted"] += 1
+            else:
+                self._free += 1
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_COMMAND):
+        """Hold a slot for the block, at the lower of `priority` and the current context's priority."""
+        priority = max(priority, current_priority.get())
+        self.acquire(priority, None if priority >= PRIORITY_BACKGROUND else self.deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def metrics(self):
+        with self._lock:
+            return {**self.stats, "slots": self.slots, "in_use": self.slots - self._free,
+                    "queued": len(self._waiters), "service_ms": round(self._service_seconds * 1000, 1)}
@@ -0,0 +1,228 @@
+import time
+
+import numpy as np
+import orjson
+
+from dag import run_dag
+
+TRELLO_URL = "https://api.trello.com/1"
+
+# What a snapshot fetches of each open board, nested in one request per board
+SNAPSHOT_PARAMS = {
+    "fields": "name",
+    "lists": "open", "list_fields": "name",
+    "cards": "open", "card_fields": "idList,due,dueComplete,idLabels,idMembers",
+    "labels": "all", "label_fields": "name,color", "labels_limit": 1000,
+    "members": "all", "member_fields": "fullName,username",
+}
+
+# Board requests in flight at once while taking a snapshot; the account's rate limiter paces them
+SNAPSHOT_CONCURRENCY = 8
+
+# Cards due within this many days count as due soon
+DUE_SOON_DAYS = 7
+
+
+class AnalyticsError(Exception):
+    """The boards behind a snapshot could not be fetched."""
+
+
+class Snapshot:
+    """The open cards of the member's boards as NumPy columns, for aggregates that don't loop over cards.
+
+    Boards, lists, labels and members are rows of small tables; a card holds the row numbers of
+    its list and board, its due time and whether it is complete. Labels and members, of which a
+    card has any number, are kept as (card row, label or member row) pairs.
+    """
+
+    def __init__(self, boards, lists, labels, members, card_list, due, due_complete, card_labels, card_members):
+        self.taken = time.time()
+        self.boards = boards  # [{"id", "name"}]
+        self.lists = lists  # [{"id", "name", "board"}], board as a row of boards
+        self.labels = labels  # [{"id", "name", "color", "board"}]
+        self.members = members  # [{"id", "name"}]
+        self.list_board = np.array([lst["board"] for lst in lists], dtype=np.int32)
+        self.card_list = card_list
+        self.card_board = self.list_board[card_list]
+        self.due = due  # datetime64[ms], NaT without a due date
+        self.due_complete = due_complete
+        self.card_labels = card_labels  # (card rows, label rows)
+        self.card_members = card_members  # (card rows, member rows)
+
+    def __len__(self):
+        return len(self.card_list)
+
+    @property
+    def age(self):
+        return time.time() - self.taken
+
+
+def due_column(cards):
+    """Trello's UTC due dates as datetime64; the trailing Z is dropped, NumPy only parses naive times."""
+    return np.array([card["due"].rstrip("Z") if card.get("due") else "NaT" for card in cards], dtype="datetime64[ms]")
+
+
+def pairs(cards, field, rows):
+    """(card row, row) pairs for the ids in each card's `field`, skipping ids missing from `rows`."""
+    card_rows, value_rows = [], []
+    for index, card in enumerate(cards):
+        for value in card.get(field) or ():
+            row = rows.get(value)
+            if row is not None:
+                card_rows.append(index)
+                value_rows.append(row)
+    return np.array(card_rows, dtype=np.int32), np.array(value_rows, dtype=np.int32)
+
+
+def build_snapshot(boards):
+    """Turn fetched boards, each a dict of board, lists, cards, labels and members, into a Snapshot."""
+    board_rows, lists, labels, members = [], [], [], []
+    list_rows, label_rows, member_rows = {}, {}, {}
+    cards = []
+    for index, data in enumerate(boards):
+        board_rows.append({"id": data["board"]["id"], "name": data["board"].get("name", "")})
+        for lst in data["lists"]:
+            list_rows[lst["id"]] = len(lists)
+            lists.append({"id": lst["id"], "name": lst.get("name", ""), "board": index})
+        for label in data["labels"]:
+            label_rows[label["id"]] = len(labels)
+            labels.append({"id": label["id"], "name": label.get("name") or "", "color": label.get("color"),
+                           "board": index})
+        for member in data["members"]:
+            # A member of several boards gets one row
+            if member["id"] not in member_rows:
+                member_rows[member["id"]] = len(members)
+                members.append({"id": member["id"], "name": member.get("fullName") or member.get("username", "")})
+        cards += data["cards"]
+
+    # Open cards on archived lists aren't shown on the board, so they aren't counted
+    cards = [card for card in cards if card.get("idList") in list_rows]
+    card_list = np.fromiter((list_rows[card["idList"]] for card in cards), dtype=np.int32, count=len(cards))
+    due_complete = np.fromiter((bool(card.get("dueComplete")) for card in cards), dtype=bool, count=len(cards))
+    return Snapshot(board_rows, lists, labels, members, card_list, due_column(cards), due_complete,
+                    pairs(cards, "idLabels", label_rows), pairs(cards, "idMembers", member_rows))
+
+
+def load_snapshot(get, limiter, concurrency=SNAPSHOT_CONCURRENCY):
+    """Fetch the member's open boards with their lists, cards, labels and members into a Snapshot.
+
+    get(url, params) performs an authenticated Trello GET and returns the response. Each board is
+    one nested request, sent through the account's rate limiter.
+    """
+    response = get(f"{TRELLO_URL}/members/me/boards", {"fields": "name", "filter": "open"})
+    if response.status_code != 200:
+        raise AnalyticsError(f"Failed to retrieve Trello boards. {response.text}")
+    boards = orjson.loads(response.content)
+
+    def fetch(board_id):
+        limiter.acquire()
+        response = get(f"{TRELLO_URL}/boards/{board_id}", SNAPSHOT_PARAMS)
+        if response.status_code != 200:
+            raise AnalyticsError(f"Failed to fetch board {board_id}. {response.text}")
+        board = orjson.loads(response.content)
+        return {"board": board, **{kind: board.get(kind, []) for kind in ("lists", "cards", "labels", "members")}}
+
+    tasks = {board["id"]: ([], lambda _, board_id=board["id"]: fetch(board_id)) for board in boards}
+    results, errors = run_dag(tasks, max_workers=concurrency)
+    if errors:
+        raise next(iter(errors.values()))
+    return build_snapshot([results[board["id"]] for board in boards])
+
+
+def aggregate(snapshot, board_id=None, now=None, due_soon_days=DUE_SOON_DAYS):
+    """Cards, overdue and due-soon counts per board and list, cards per label and workload per member.
+
+    With board_id only that board's cards, lists and labels are counted. Overdue cards have a due
+    date before `now` and aren't marked complete.
+    """
+    now = np.datetime64(int((now or time.time()) * 1000), "ms")
+    cards = np.ones(len(snapshot), dtype=bool)
+    boards = range(len(snapshot.boards))
+    if board_id is not None:
+        board = next((index for index, b in enumerate(snapshot.boards) if b["id"] == board_id), None)
+        if board is None:
+            raise AnalyticsError(f"Board {board_id} is not one of your open boards.")
+        cards &= snapshot.card_board == board
+        boards = [board]
+
+    # Comparisons with NaT are false, so cards without a due date are neither
+    pending = cards & ~snapshot.due_complete
+    overdue = pending & (snapshot.due < now)
+    due_soon = pending & (snapshot.due >= now) & (snapshot.due < now + np.timedelta64(due_soon_days, "D"))
+
+    n_boards, n_lists = len(snapshot.boards), len(snapshot.lists)
+    per_board = {name: np.bincount(snapshot.card_board[mask], minlength=n_boards).tolist()
+                 for name, mask in (("cards", cards), ("overdue", overdue), ("due_soon", due_soon))}
+    per_list = {name: np.bincount(snapshot.card_list[mask], minlength=n_lists).tolist()
+                for name, mask in (("cards", cards), ("overdue", overdue), ("due_soon", due_soon))}
+
+    label_cards, label_rows = snapshot.card_labels
+    per_label = np.bincount(label_rows[cards[label_cards]], minlength=len(snapshot.labels)).tolist()
+
+    member_cards, member_rows = snapshot.card_members
+    n_members = len(snapshot.members)
+    member_load = np.bincount(member_rows[cards[member_cards]], minlength=n_members).tolist()
+    member_overdue = np.bincount(member_rows[overdue[member_cards]], minlength=n_members).tolist()
+    assigned = np.zeros(len(snapshot), dtype=bool)
+    assigned[member_cards] = True
+
+    in_scope = set(boards)
+    return {
+        "cards": int(cards.sum()),
+        "overdue": int(overdue.sum()),
+        "due_soon": int(due_soon.sum()),
+        "unassigned": int((cards & ~assigned).sum()),
+        "boards": [{**snapshot.boards[b], **{name: counts[b] for name, counts in per_board.items()}} for b in boards],
+        "lists": [{"id": lst["id"], "name": lst["name"], "board": snapshot.boards[lst["board"]]["name"],
+                   **{name: counts[index] for name, counts in per_list.items()}}
+                  for index, lst in enumerate(snapshot.lists) if lst["board"] in in_scope],
+        "labels": sorted(({"id": label["id"], "name": label["name"], "color": label["color"],
+                           "board": snapshot.boards[label["board"]]["name"], "cards": per_label[index]}
+                          for index, label in enumerate(snapshot.labels) if label["board"] in in_scope),
+                         key=lambda label: -label["cards"]),
+        "members": sorted(({**member, "cards": member_load[index], "overdue": member_overdue[index]}
+                           for index, member in enumerate(snapshot.members) if member_load[index]),
+                          key=lambda member: -member["cards"]),
+    }
+
+
+def describe(report, metric, group, ascending=False, limit=5):
+    """Answer a question about counts from an aggregate report in a sentence or two."""
+    def ranked(rows, key):
+        rows = sorted(rows, key=lambda row: row[key], reverse=not ascending)
+        return rows[:limit]
+
+    def where(row):
+        return f"'{row['name']}'" + (f" on '{row['board']}'" if "board" in row else "")
+
+    if metric == "labels":
+        rows = [row for row in ranked(report["labels"], "cards") if row["cards"]]
+        if not rows:
+            return "None of your open cards have labels."
+        return "Cards per label: " + ", ".join(
+            f"'{row['name'] or row['color']}' on '{row['board']}' {row['cards']}" for row in rows) + "."
+
+    if metric == "workload":
+        rows = ranked(report["members"], "cards")
+        if not rows:
+            return f"No one is assigned to any of your {report['cards']} open cards."
+        answer = "Open cards per member: " + ", ".join(
+            f"{row['name']} {row['cards']}" + (f" ({row['overdue']} overdue)" if row["overdue"] else "")
+            for row in rows)
+        return answer + f". {report['unassigned']} cards have no one assigned."
+
+    key = "overdue" if metric == "overdue" else "cards"
+    noun = "overdue cards" if metric == "overdue" else "open cards"
+    if not report[key]:
+        return f"You have no {noun}."
+    if group == "list":
+        rows = [row for row in ranked(report["lists"], key) if row[key] or ascending]
+        return f"You have {report[key]} {noun}. Per list: " + ", ".join(
+            f"{where(row)} {row[key]}" for row in rows) + "."
+    rows = ranked(report["boards"], key)
+    most = "fewest" if ascending else "most"
+    answer = f"You have {report[key]} {noun} on {len(report['boards'])} boards. '{rows[0]['name']}' has the {most}"
+    answer += f" ({rows[0][key]})"
+    if len(rows) > 1:
+        answer += ", then " + ", ".join(f"'{row['name']}' ({row[key]})" for row in rows[1:])
+    return answer + "."
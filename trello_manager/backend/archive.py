@@ -0,0 +1,206 @@
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import orjson
+
+from bulk import send
+from ndjson import iter_json_array
+from resilience import trello
+
+TRELLO_URL = "https://api.trello.com/1"
+
+ARCHIVE_VERSION = 1
+
+# Record types in archive order; each only refers to ids of the types before it
+RECORD_TYPES = ("board", "label", "list", "card", "checklist")
+
+# What an archive keeps of each object, fetched with one streamed request per type
+EXPORTS = {
+    "label": ("labels", {"fields": "name,color", "limit": 1000}),
+    "list": ("lists", {"fields": "name,pos,closed", "filter": "all"}),
+    "card": ("cards", {"fields": "name,desc,idList,pos,closed,due,dueComplete,idLabels", "filter": "all"}),
+    "checklist": ("checklists", {"fields": "name,idCard,pos", "checkItem_fields": "name,pos,state"}),
+}
+
+# Write requests in flight at once while importing, all through the Trello rate limiter
+IMPORT_CONCURRENCY = 8
+
+# Upstream bytes read per chunk when streaming exports
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveError(Exception):
+    """A board could not be exported, or an archive could not be imported."""
+
+
+def record(kind, obj):
+    return orjson.dumps({"type": kind, **obj}) + b"\n"
+
+
+def export_board(board_id, auth):
+    """Return the NDJSON lines of a board archive as a generator.
+
+    The board is fetched up front, so a missing board raises ArchiveError before anything is
+    streamed. Labels, lists, cards and checklists then stream from one request each, holding one
+    object at a time, and a final "end" record with the counts marks the archive complete.
+    """
+    response = trello.get(f"{TRELLO_URL}/boards/{board_id}", params={"fields": "name,desc,closed", **auth})
+    if response.status_code != 200:
+        raise ArchiveError(f"Failed to fetch Trello board {board_id}. {response.text}")
+    board = orjson.loads(response.content)
+
+    def lines():
+        yield record("archive", {"version": ARCHIVE_VERSION, "board": board_id})
+        yield record("board", board)
+        counts = Counter(board=1)
+        for kind, (path, params) in EXPORTS.items():
+            response = trello.get(f"{TRELLO_URL}/boards/{board_id}/{path}", params={**params, **auth}, stream=True)
+            try:
+                if response.status_code != 200:
+                    raise ArchiveError(f"Failed to fetch the {path} of board {board_id}. {response.text}")
+                for obj in iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE)):
+                    counts[kind] += 1
+                    yield record(kind, obj)
+            finally:
+                response.close()
+        yield record("end", {"counts": counts})
+
+    return lines()
+
+
+class BoardImporter:
+    """Recreates an archived board from its records as they arrive.
+
+    Objects of one type are created concurrently, up to `concurrency` at a time through the rate
+    limiter; a new type starts once the previous one is done, since it refers to its ids. Memory
+    holds the id map and the requests in flight, not the archive.
+    """
+
+    def __init__(self, auth, limiter, name=None, concurrency=IMPORT_CONCURRENCY, progress=None):
+        self.auth = auth
+        self.limiter = limiter
+        self.name = name
+        self.progress = progress
+        self.ids = {}  # Archived id -> id of the object created for it
+        self.board = None
+        self.counts = Counter()
+        self.failed = []
+        self.complete = False
+        self._type = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._max_pending = concurrency * 2
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="board-import")
+
+    def feed(self, rec):
+        kind = rec.pop("type", None)
+        if kind == "archive":
+            if rec.get("version") != ARCHIVE_VERSION:
+                raise ArchiveError(f"Unsupported archive version {rec.get('version')}.")
+            return
+        if kind == "end":
+            self.complete = True
+            return
+        if kind not in RECORD_TYPES:
+            raise ArchiveError(f"Unknown archive record type '{kind}'.")
+        if self.board is None and kind != "board":
+            raise ArchiveError("The archive doesn't start with its board.")
+
+        if kind != self._type:
+            self._drain()
+            self._type = kind
+        if kind == "board":
+            self.board = self._create(kind, rec)
+            return
+
+        while len(self._pending) >= self._max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        self._pending.add(self._pool.submit(self._create, kind, rec))
+
+    def finish(self):
+        """Wait for the writes in flight and report what was imported."""
+        self._drain()
+        self._pool.shutdown()
+        if not self.complete:
+            self.failed.append({"type": "archive", "error": "The archive is truncated, it has no end record."})
+        return {"board": self.board, "created": dict(self.counts), "failed": self.failed}
+
+    def _drain(self):
+        done, _ = wait(self._pending)
+        self._pending = set()
+        self._collect(done)
+
+    def _collect(self, futures):
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                self.failed.append({"type": self._type, "error": str(e)})
+        if self.progress:
+            self.progress(sum(self.counts.values()) + len(self.failed), None)
+
+    def _post(self, kind, path, params):
+        response = send("POST", f"{TRELLO_URL}{path}", {**params, **self.auth}, self.limiter)
+        if response.status_code != 200:
+            raise ArchiveError(f"Failed to create {kind} '{params.get('name')}'. {response.text}")
+        return orjson.loads(response.content)
+
+    def _mapped(self, kind, archived_id):
+        if archived_id not in self.ids:
+            raise ArchiveError(f"Its {kind} {archived_id} was not imported.")
+        return self.ids[archived_id]
+
+    def _create(self, kind, rec):
+        """Create one object from its record and remember its new id."""
+        name = rec.get("name") or ""
+        if kind == "board":
+            obj = self._post(kind, "/boards", {"name": self.name or name, "desc": rec.get("desc") or "",
+                                               "defaultLists": "false", "defaultLabels": "false"})
+        elif kind == "label":
+            obj = self._post(kind, "/labels", {"name": name, "color": rec.get("color") or "null",
+                                               "idBoard": self.board["id"]})
+        elif kind == "list":
+            obj = self._post(kind, "/lists", {"name": name, "pos": rec.get("pos", "bottom"), "idBoard": self.board["id"]})
+        elif kind == "card":
+            params = {"name": name, "desc": rec.get("desc") or "", "pos": rec.get("pos", "bottom"),
+                      "idList": self._mapped("list", rec["idList"]),
+                      "idLabels": ",".join(self.ids[label] for label in rec.get("idLabels", []) if label in self.ids)}
+            if rec.get("due"):
+                params.update(due=rec["due"], dueComplete=str(bool(rec.get("dueComplete"))).lower())
+            obj = self._post(kind, "/cards", params)
+        else:
+            obj = self._post(kind, "/checklists", {"name": name, "pos": rec.get("pos", "bottom"),
+                                                   "idCard": self._mapped("card", rec["idCard"])})
+            for item in rec.get("checkItems", []):
+                self._post("check item", f"/checklists/{obj['id']}/checkItems",
+                           {"name": item["name"], "pos": item.get("pos", "bottom"),
+                            "checked": str(item.get("state") == "complete").lower()})
+
+        if rec.get("closed") and kind in ("list", "card"):
+            # Archived objects are created open, then archived
+            response = send("PUT", f"{TRELLO_URL}/{kind}s/{obj['id']}", {"closed": "true", **self.auth}, self.limiter)
+            if response.status_code != 200:
+                raise ArchiveError(f"Failed to archive {kind} '{name}'. {response.text}")
+
+        with self._lock:
+            if "id" in rec:
+                self.ids[rec["id"]] = obj["id"]
+            self.counts[kind] += 1
+        return obj
+
+
+def import_board(records, auth, limiter, name=None, progress=None):
+    """Recreate a board from archive records; `name` renames the new board."""
+    importer = BoardImporter(auth, limiter, name, progress=progress)
+    try:
+        for rec in records:
+            importer.feed(rec)
+    except Exception as e:
+        if importer.board is None:
+            importer.finish()
+            raise
+        # Keep what was created and report where the archive stopped making sense
+        importer.failed.append({"type": "archive", "error": str(e)})
+    return importer.finish()
@@ -0,0 +1,87 @@
+"""/analytics aggregates over 100k cards: NumPy columns versus a loop over the card dicts.
+
+Builds a synthetic snapshot of BOARDS boards, then times the aggregate report both ways.
+Run from the backend folder: python benchmarks/analytics.py
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analytics import aggregate, build_snapshot
+
+BOARDS = 20
+LISTS_PER_BOARD = 10
+CARDS = 100_000
+LABELS_PER_BOARD = 6
+MEMBERS = 50
+ROUNDS = 20
+
+
+def make_boards(seed=1):
+    """Boards shaped like the lists, cards, labels and members Trello returns for a snapshot."""
+    rng = random.Random(seed)
+    members = [{"id": f"m{m:023d}", "fullName": f"Member {m}"} for m in range(MEMBERS)]
+    boards = []
+    for b in range(BOARDS):
+        lists = [{"id": f"l{b:03d}{l:020d}", "name": f"List {l + 1}"} for l in range(LISTS_PER_BOARD)]
+        labels = [{"id": f"t{b:03d}{t:020d}", "name": f"Label {t + 1}", "color": "green"}
+                  for t in range(LABELS_PER_BOARD)]
+        cards = []
+        for c in range(CARDS // BOARDS):
+            due = None
+            if rng.random() < 0.4:
+                due = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00.000Z"
+            cards.append({"id": f"c{b:03d}{c:020d}", "idList": rng.choice(lists)["id"], "due": due,
+                          "dueComplete": rng.random() < 0.3,
+                          "idLabels": [label["id"] for label in rng.sample(labels, rng.randint(0, 2))],
+                          "idMembers": [member["id"] for member in rng.sample(members, rng.randint(0, 2))]})
+        boards.append({"board": {"id": f"b{b:023d}", "name": f"Board {b + 1}"}, "lists": lists, "cards": cards,
+                       "labels": labels, "members": members[:MEMBERS // 2 + b]})
+    return boards
+
+
+def aggregate_dicts(boards, now):
+    """The same counts by looping over every card dict, as the backend would without columns."""
+    per_list, overdue_list, per_label, per_member, overdue_member = Counter(), Counter(), Counter(), Counter(), Counter()
+    for data in boards:
+        for card in data["cards"]:
+            per_list[card["idList"]] += 1
+            late = card["due"] and not card["dueComplete"] and card["due"] < now
+            if late:
+                overdue_list[card["idList"]] += 1
+            for label in card["idLabels"]:
+                per_label[label] += 1
+            for member in card["idMembers"]:
+                per_member[member] += 1
+                if late:
+                    overdue_member[member] += 1
+    return per_list, overdue_list, per_label, per_member, overdue_member
+
+
+def timed(fn, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+
+if __name__ == "__main__":
+    boards = make_boards()
+    now = time.mktime((2025, 7, 1, 0, 0, 0, 0, 0, -1))
+    build_ms, snapshot = timed(lambda: build_snapshot(boards), rounds=3)
+    columns_ms, report = timed(lambda: aggregate(snapshot, now=now))
+    loop_ms, counts = timed(lambda: aggregate_dicts(boards, "2025-07-01T00:00:00.000Z"))
+    board_ms, _ = timed(lambda: aggregate(snapshot, board_id=snapshot.boards[0]["id"], now=now))
+
+    assert report["overdue"] == sum(counts[1].values())
+    assert [lst["cards"] for lst in report["lists"]] == [counts[0][lst["id"]] for lst in snapshot.lists]
+    print(f"{len(snapshot)} cards on {BOARDS} boards, {len(snapshot.lists)} lists, {report['overdue']} overdue\n")
+    print(f"{'step':34} {'ms':>8}")
+    print(f"{'build snapshot (once per refresh)':34} {build_ms:8.1f}")
+    print(f"{'aggregate, loop over dicts':34} {loop_ms:8.1f}")
+    print(f"{'aggregate, NumPy columns':34} {columns_ms:8.1f}")
+    print(f"{'aggregate one board, NumPy':34} {board_ms:8.1f}")
@@ -0,0 +1,103 @@
+"""Board export and import through the archive endpoints' code, against the local Trello stub.
+
+Seeds a board of 10 lists x 1000 cards (10k cards, a checklist on every tenth) in a stub
+process, then compares: export as one streamed archive versus walking lists, cards and each
+card's checklists one request at a time; and import with concurrent writes versus one write at
+a time. Run from the backend folder:
+
+    python benchmarks/archive.py
+"""
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import orjson
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import archive
+from ndjson import gzip_chunks, iter_records
+from ratelimit import RateLimiter
+
+PORT = 8766
+LISTS = 10
+CARDS_PER_LIST = 1000
+LATENCY = 0.002
+AUTH = {"key": "stub", "token": "stub"}
+TRELLO_RATE = 9  # Requests per second Trello allows, for the projected import time
+
+
+def naive_export(base_url, board_id):
+    """The request-per-object walk a client does through /getLists, /getCards and /getFields."""
+    session = requests.Session()
+    board = session.get(f"{base_url}/boards/{board_id}", params=AUTH).json()
+    lists = session.get(f"{base_url}/boards/{board_id}/lists", params=AUTH).json()
+    cards, checklists = [], []
+    for lst in lists:
+        for card in session.get(f"{base_url}/lists/{lst['id']}/cards", params=AUTH).json():
+            cards.append(card)
+            checklists += session.get(f"{base_url}/cards/{card['id']}/checklists", params=AUTH).json()
+    body = orjson.dumps({"board": board, "lists": lists, "cards": cards, "checklists": checklists})
+    return len(body), 2 + len(lists) + len(cards)
+
+
+def streamed_export(board_id, compress=False):
+    """Consume the archive as the endpoint streams it, keeping only its size."""
+    lines = archive.export_board(board_id, AUTH)
+    return sum(len(chunk) for chunk in (gzip_chunks(lines) if compress else lines)), 1 + len(archive.EXPORTS)
+
+
+def timed(fn, *args):
+    """Seconds taken, then peak traced MiB on a second run (tracing slows the first one down)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    stub = subprocess.Popen([sys.executable, os.path.join(HERE, "..", "scripts", "trello_stub.py"), "--port", str(PORT),
+                             "--lists", str(LISTS), "--cards", str(CARDS_PER_LIST), "--latency", str(LATENCY)],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        stub.stdout.readline()  # Serving once it prints its URL
+        base_url = f"http://127.0.0.1:{PORT}/1"
+        archive.TRELLO_URL = base_url
+        board_id = requests.get(f"{base_url}/members/me/boards", params=AUTH).json()[0]["id"]
+
+        print(f"Board of {LISTS} lists x {CARDS_PER_LIST} cards, stub latency {LATENCY * 1000:.0f} ms\n")
+        print(f"{'export':24} {'seconds':>8} {'requests':>9} {'MiB':>7} {'peak MiB':>9}")
+        for label, fn, args in (("request per object", naive_export, (base_url, board_id)),
+                                ("streamed NDJSON", streamed_export, (board_id,)),
+                                ("streamed NDJSON, gzip", streamed_export, (board_id, True))):
+            (size, count), seconds, peak = timed(fn, *args)
+            print(f"{label:24} {seconds:8.2f} {count:9} {size / 2**20:7.2f} {peak:9.2f}")
+
+        archive_bytes = b"".join(archive.export_board(board_id, AUTH))
+        print(f"\n{'import':24} {'seconds':>8} {'writes':>9} {'writes/s':>9} {f'at {TRELLO_RATE}/s':>10}")
+        for concurrency in (1, archive.IMPORT_CONCURRENCY):
+            importer = archive.BoardImporter(AUTH, RateLimiter(1_000_000, 1_000_000), name="Imported",
+                                             concurrency=concurrency)
+            start = time.perf_counter()
+            for rec in iter_records([archive_bytes]):
+                importer.feed(rec)
+            result = importer.finish()
+            seconds = time.perf_counter() - start
+            checklists = [orjson.loads(line) for line in archive_bytes.splitlines() if b'"type":"checklist"' in line]
+            writes = sum(result["created"].values()) + sum(len(c["checkItems"]) for c in checklists)
+            print(f"{f'{concurrency} in flight':24} {seconds:8.2f} {writes:9} {writes / seconds:9.0f} "
+                  f"{writes / TRELLO_RATE / 60:6.1f} min" + (f"  {len(result['failed'])} failed" if result["failed"] else ""))
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""LLM extraction latency and parse-success rate, free-form prompt versus schema-constrained output.
+
+Needs a local Ollama with the models pulled. Run from the backend folder:
+python benchmarks/extraction.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm_extraction import extract_with_llm, warm_up
+
+# (request, expected action_type, expected object_type)
+COMMANDS = [
+    ("Create a board for Work with lists: Urgent, Pending, Completed", "create", "board"),
+    ("Make a new board called Groceries", "create", "board"),
+    ("Delete the board Old Project", "delete", "board"),
+    ("Add a card Buy milk to the list Today", "create", "card"),
+    ("Show me all my boards", "list", "board"),
+    ("Rename the list Doing to In Progress", "update", "list"),
+    ("Remove the card Fix login bug", "delete", "card"),
+    ("Create a board Q3 with lists Plan and Ship and 2 cards: Kickoff, Review", "create", "board"),
+]
+
+# (label, model, schema-constrained)
+RUNS = [
+    ("free-form llama3.2", "llama3.2", False),
+    ("schema llama3.2", "llama3.2", True),
+    ("schema llama3.2:1b", "llama3.2:1b", True),
+]
+
+
+def main():
+    warm_up({model for _, model, _ in RUNS}, "10m")
+    print(f"{len(COMMANDS)} commands\n")
+    print(f"{'run':22} {'p50 ms':>8} {'p95 ms':>8} {'parsed':>7} {'correct':>8}")
+    for label, model, schema in RUNS:
+        latencies, parsed, correct = [], 0, 0
+        for text, action_type, object_type in COMMANDS:
+            start = time.perf_counter()
+            result = extract_with_llm(text, model, keep_alive="10m", schema=schema)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if result is not None:
+                parsed += 1
+                correct += result.get("action_type") == action_type and result.get("object_type") == object_type
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{label:22} {statistics.median(latencies):8.0f} {p95:8.0f} "
+              f"{parsed / len(COMMANDS):7.0%} {correct / len(COMMANDS):8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Latency, throughput, memory and accuracy of intent extraction backends on a labelled corpus.
+
+Backends: regex (rules only, no pipeline), sm (en_core_web_sm), trf (en_core_web_trf),
+onnx (int8 ONNX Runtime NER from ONNX_NER_PATH, threads from ONNX_NER_THREADS) and llm
+(schema-constrained Ollama extraction). Each runs in its own process so memory figures
+don't mix. Run from the backend folder:
+
+    python benchmarks/intents.py                 # every backend
+    python benchmarks/intents.py regex sm        # a subset
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+CORPUS_PATH = os.path.join(HERE, "intent_corpus.jsonl")
+BACKENDS = ["regex", "sm", "trf", "onnx", "llm"]
+SPACY_MODELS = {"sm": "en_core_web_sm", "trf": "en_core_web_trf"}
+LLM_MODEL = "llama3.2:1b"
+FIELDS = ["action_type", "object_type", "name", "lists", "cards"]
+ROUNDS = 3
+
+
+def load_corpus():
+    with open(CORPUS_PATH) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def rss_mb():
+    """Resident set size of this process in MiB (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def normalise(field, value):
+    if field in ("lists", "cards"):
+        return [str(v).strip().lower() for v in value or []]
+    return str(value).strip().lower() if value else None
+
+
+def score(predictions, corpus):
+    """Share of labelled values each field got right, plus the share of fully correct examples."""
+    correct = {field: 0 for field in FIELDS}
+    labelled = {field: 0 for field in FIELDS}
+    exact = 0
+    for predicted, expected in zip(predictions, corpus):
+        all_right = predicted is not None
+        for field in FIELDS:
+            if field not in expected:
+                continue
+            labelled[field] += 1
+            right = predicted is not None and normalise(field, predicted.get(field)) == normalise(field, expected[field])
+            correct[field] += right
+            all_right = all_right and right
+        exact += all_right
+    accuracy = {field: correct[field] / labelled[field] for field in FIELDS if labelled[field]}
+    accuracy["exact"] = exact / len(corpus)
+    return accuracy
+
+
+def make_extractor(backend):
+    """Return (extract one text, extract many texts) for a backend."""
+    from intents import extract_entities
+
+    if backend == "regex":
+        return (lambda text: extract_entities(text),
+                lambda texts: [extract_entities(text) for text in texts])
+
+    if backend in SPACY_MODELS:
+        import spacy
+        nlp = spacy.load(SPACY_MODELS[backend])
+        return (lambda text: extract_entities(text, nlp),
+                lambda texts: [extract_entities(text, nlp, doc) for text, doc in zip(texts, nlp.pipe(texts, batch_size=32))])
+
+    if backend == "onnx":
+        import spacy
+        from onnx_ner import OnnxNer
+        ner = OnnxNer(os.getenv("ONNX_NER_PATH", "./onnx_ner"), threads=int(os.getenv("ONNX_NER_THREADS", "1")))
+        tokenizer = spacy.blank("en")
+        return (lambda text: extract_entities(text, tokenizer, entities=ner(text)),
+                lambda texts: [extract_entities(text, tokenizer, entities=ner(text)) for text in texts])
+
+    from llm_extraction import extract_with_llm, warm_up
+    warm_up([LLM_MODEL], "10m")
+
+    def extract(text):
+        return extract_with_llm(text, LLM_MODEL, keep_alive="10m")
+
+    return extract, lambda texts: [extract(text) for text in texts]
+
+
+def run_backend(backend):
+    """Measure one backend in this process and return its report."""
+    corpus = load_corpus()
+    texts = [example["text"] for example in corpus]
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    extract_one, extract_many = make_extractor(backend)
+    load_seconds = time.perf_counter() - start
+
+    extract_one(texts[0])  # Warm caches outside the timings
+    latencies = []
+    predictions = []
+    for text in texts:
+        start = time.perf_counter()
+        predictions.append(extract_one(text))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batch_seconds = []
+    for _ in range(ROUNDS if backend != "llm" else 1):
+        start = time.perf_counter()
+        extract_many(texts)
+        batch_seconds.append(time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_mb() - rss_before,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+        "throughput": len(texts) / min(batch_seconds),
+        "accuracy": score(predictions, corpus),
+    }
+
+
+def main(backends):
+    reports = []
+    for backend in backends:
+        # A fresh interpreter per backend keeps the memory figures separate
+        result = subprocess.run([sys.executable, __file__, "--child", backend], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{backend}: failed\n{result.stderr.strip().splitlines()[-1] if result.stderr else ''}")
+            continue
+        reports.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{len(load_corpus())} labelled commands\n")
+    print(f"{'backend':8} {'load s':>7} {'RSS MiB':>8} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8}  "
+          + " ".join(f"{field[:8]:>8}" for field in FIELDS + ["exact"]))
+    for r in reports:
+        accuracy = r["accuracy"]
+        print(f"{r['backend']:8} {r['load_seconds']:7.1f} {r['rss_mb']:8.0f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{r['throughput']:8.1f}  " + " ".join(f"{accuracy.get(field, 0):8.0%}" for field in FIELDS + ["exact"]))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(run_backend(sys.argv[2])))
+    else:
+        main(sys.argv[1:] or BACKENDS)
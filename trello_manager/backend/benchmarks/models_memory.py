@@ -0,0 +1,47 @@
+"""Memory and decode time of 100k cached cards: raw dicts versus the Card model.
+
+Run from the backend folder: python benchmarks/models_memory.py
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from models import Card, decode_many
+from serialization import make_card
+
+CARD_COUNT = 100_000
+
+
+def measure(label, build):
+    """Print the memory retained by build()'s result and the time it took."""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    # Traced separately, tracemalloc slows allocation down too much to time under it
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:14} {retained / 2**20:8.1f} MiB  {retained / CARD_COUNT:6.0f} B/card  decode {elapsed * 1000:7.0f} ms")
+    return result
+
+
+def main():
+    raw = orjson.dumps([make_card(i) for i in range(CARD_COUNT)])
+    print(f"{CARD_COUNT} cards, {len(raw) / 2**20:.0f} MiB of upstream JSON\n")
+    measure("raw dicts", lambda: orjson.loads(raw))
+    measure("Card models", lambda: decode_many(Card, raw))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Tail latency with and without hedged GETs, and circuit breaker behaviour, against the local Trello stub.
+
+The stub answers in LATENCY seconds but stalls SLOW_SECONDS on SLOW_RATE of requests; then it
+fails every request for a while and recovers. Run from the backend folder:
+
+    python benchmarks/resilience.py
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+from resilience import CircuitOpen, Upstream
+from trello_stub import start_stub
+
+REQUESTS = 1000
+CLIENTS = 8
+LATENCY = 0.02
+SLOW_RATE = 0.03
+SLOW_SECONDS = 1.0
+
+
+def percentiles(latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    return statistics.median(latencies), cuts[94], cuts[98]
+
+
+def run(get, url):
+    def timed(_):
+        start = time.perf_counter()
+        get(url)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        return list(pool.map(timed, range(REQUESTS)))
+
+
+def tail_latency(server, base_url):
+    url = f"{base_url}/members/me/boards"
+    server.faults.update(latency=LATENCY, slow_rate=SLOW_RATE, slow_seconds=SLOW_SECONDS, fail_rate=0.0)
+    upstream = Upstream()
+
+    print(f"{REQUESTS} GETs from {CLIENTS} clients, {SLOW_RATE:.0%} stalled {SLOW_SECONDS:.0f} s\n")
+    print(f"{'client':14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedges':>7} {'won':>5}")
+    for label, get in (("plain", lambda u: requests.get(u, timeout=10)), ("hedged", upstream.get)):
+        p50, p95, p99 = percentiles(run(get, url))
+        stats = upstream.stats if label == "hedged" else {"hedges": 0, "hedge_wins": 0}
+        print(f"{label:14} {p50:8.1f} {p95:8.1f} {p99:8.1f} {stats['hedges']:7} {stats['hedge_wins']:5}")
+
+
+def breaker(server, base_url):
+    url = f"{base_url}/members/me/boards"
+    server.faults.update(latency=LATENCY, slow_rate=0.0, fail_rate=1.0)
+    upstream = Upstream()
+    upstream.breaker.reset_seconds = 1
+
+    print("\nTrello failing every request:")
+    for attempt in range(8):
+        start = time.perf_counter()
+        try:
+            outcome = upstream.get(url).status_code
+        except CircuitOpen:
+            outcome = "rejected"
+        print(f"  request {attempt + 1}: {outcome!s:9} {(time.perf_counter() - start) * 1000:6.1f} ms, "
+              f"breaker {upstream.breaker.state}")
+
+    server.faults.update(fail_rate=0.0)
+    time.sleep(upstream.breaker.reset_seconds)
+    print("Trello recovered, after the reset delay:")
+    for attempt in range(2):
+        print(f"  request {attempt + 1}: {upstream.get(url).status_code}, breaker {upstream.breaker.state}")
+    print(f"  {upstream.metrics()}")
+
+
+if __name__ == "__main__":
+    server, base_url = start_stub()
+    tail_latency(server, base_url)
+    breaker(server, base_url)
+    server.shutdown()
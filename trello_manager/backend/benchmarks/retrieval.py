@@ -0,0 +1,88 @@
+"""Recall@k versus query latency of the chat_history HNSW index across collection sizes and settings.
+
+Uses synthetic clustered embeddings the size of the default embedding model's (384 floats), so
+no model is loaded and the exact neighbours can be computed with NumPy. Run from the backend folder:
+
+    python benchmarks/retrieval.py                  # default sizes
+    python benchmarks/retrieval.py 1000 100000      # chosen sizes
+"""
+import os
+import statistics
+import sys
+import time
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from history_index import index_metadata
+
+SIZES = [1_000, 10_000, 50_000]
+DIMENSIONS = 384
+CLUSTERS = 50
+QUERIES = 200
+K = 5
+ADD_BATCH = 5_000
+
+# (space, M, construction ef, search ef values measured on the same index)
+CONFIGS = [
+    ("l2", 16, 100, [10]),  # Chroma's defaults
+    ("cosine", 16, 100, [10, 50, 100]),
+    ("cosine", 32, 200, [50, 100, 200]),
+]
+
+
+def make_vectors(count, rng):
+    """Unit vectors scattered around cluster centres, like embeddings of similar requests."""
+    centres = rng.normal(size=(CLUSTERS, DIMENSIONS))
+    vectors = centres[rng.integers(0, CLUSTERS, count)] + rng.normal(scale=0.6, size=(count, DIMENSIONS))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_neighbours(vectors, queries):
+    # On unit vectors cosine and l2 order neighbours the same way
+    scores = queries @ vectors.T
+    return np.argpartition(-scores, K, axis=1)[:, :K]
+
+
+def measure(collection, queries, truth):
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=K, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({int(i) for i in result["ids"][0]} & {int(i) for i in expected})
+    return hits / (len(queries) * K), statistics.median(latencies), statistics.quantiles(latencies, n=20)[-1]
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    client = chromadb.EphemeralClient()
+    print(f"{'size':>7} {'space':6} {'M':>3} {'ef_c':>5} {'ef_s':>5} {'build s':>8} {f'recall@{K}':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for size in sizes:
+        vectors = make_vectors(size, rng)
+        queries = make_vectors(QUERIES, rng)
+        truth = exact_neighbours(vectors, queries)
+
+        for space, m, construction_ef, search_efs in CONFIGS:
+            name = f"bench_{size}_{space}_{m}_{construction_ef}"
+            collection = client.create_collection(name=name, metadata=index_metadata(space, m, construction_ef,
+                                                                                     search_efs[0]))
+            start = time.perf_counter()
+            for offset in range(0, size, ADD_BATCH):
+                batch = vectors[offset:offset + ADD_BATCH]
+                collection.add(ids=[str(i) for i in range(offset, offset + len(batch))], embeddings=batch.tolist())
+            build_seconds = time.perf_counter() - start
+
+            for search_ef in search_efs:
+                if search_ef != search_efs[0]:
+                    collection.modify(metadata={"hnsw:search_ef": search_ef})
+                recall, p50, p95 = measure(collection, queries, truth)
+                print(f"{size:7} {space:6} {m:3} {construction_ef:5} {search_ef:5} {build_seconds:8.1f} "
+                      f"{recall:9.1%} {p50:7.2f} {p95:7.2f}")
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
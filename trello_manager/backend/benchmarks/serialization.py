@@ -0,0 +1,80 @@
+"""Bytes-on-wire and serialisation time for a synthetic 5k-card board.
+
+Run from the backend folder: python benchmarks/serialization.py
+"""
+import gzip
+import json
+import time
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CARD_COUNT = 5000
+ROUNDS = 20
+
+
+def make_card(i):
+    """Build a card shaped like the full object returned by /1/lists/{id}/cards."""
+    return {
+        "id": f"{0x65000000 + i:08x}0000000000000000",
+        "badges": {"attachments": i % 3, "checkItems": 4, "checkItemsChecked": i % 5, "comments": i % 7,
+                   "description": True, "due": None, "dueComplete": False, "subscribed": False, "votes": 0},
+        "checkItemStates": [],
+        "closed": False,
+        "dateLastActivity": "2025-03-01T12:00:00.000Z",
+        "desc": f"Description for card number {i}. " * 3,
+        "due": "2025-04-01T12:00:00.000Z" if i % 4 == 0 else None,
+        "dueComplete": False,
+        "idBoard": "65000000aaaaaaaaaaaaaaaa",
+        "idChecklists": [],
+        "idLabels": ["65000000bbbbbbbbbbbbbbbb"] if i % 2 else [],
+        "idList": f"65000000cccccccccccc{i % 10:04d}",
+        "idMembers": [],
+        "labels": [],
+        "name": f"Card {i}",
+        "pos": 16384 * (i + 1),
+        "shortUrl": f"https://trello.com/c/{i:08d}",
+        "url": f"https://trello.com/c/{i:08d}/card-{i}",
+    }
+
+
+def timed(fn):
+    """Return the best time in milliseconds over ROUNDS calls of fn."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    cards = [make_card(i) for i in range(CARD_COUNT)]
+    upstream = orjson.dumps(cards)
+
+    print(f"{CARD_COUNT} cards, upstream payload {len(upstream) / 1024:.0f} KiB\n")
+    print("Serialisation (best of %d):" % ROUNDS)
+    print(f"  json.loads + json.dumps      {timed(lambda: json.dumps({'cards': json.loads(upstream)})):8.2f} ms")
+    print(f"  orjson.loads + orjson.dumps  {timed(lambda: orjson.dumps({'cards': orjson.loads(upstream)})):8.2f} ms")
+    raw_ms = timed(lambda: b'{"cards":' + upstream + b'}')
+    print(f"  raw pass-through             {raw_ms:8.2f} ms")
+
+    projected = orjson.dumps([{k: c[k] for k in ("id", "name", "desc", "due")} for c in cards])
+    print("\nBytes on wire:")
+    for label, body in (("full", upstream), ("fields=name,desc,due", projected)):
+        print(f"  {label:22} identity {len(body) / 1024:8.0f} KiB", end="")
+        print(f"   gzip {len(gzip.compress(body, 6)) / 1024:6.0f} KiB", end="")
+        if brotli:
+            print(f"   br {len(brotli.compress(body, quality=4)) / 1024:6.0f} KiB", end="")
+        print()
+    print(f"\n  gzip level 6 time {timed(lambda: gzip.compress(upstream, 6)):.2f} ms")
+    if brotli:
+        print(f"  brotli q4 time    {timed(lambda: brotli.compress(upstream, quality=4)):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+from collections import defaultdict
+from dataclasses import asdict
+
+import orjson
+
+from bulk import send
+from dag import DependencyFailed, run_dag
+from models import Board, Card, TrelloList, decode
+
+TRELLO_URL = "https://api.trello.com/1"
+
+# Steps of one plan sent to Trello at the same time
+PLAN_CONCURRENCY = 8
+
+# Gap between explicit positions, so concurrently created lists and cards keep the requested order
+POSITION_STEP = 16384
+
+# Model and endpoint used to create each kind of plan step
+STEP_KINDS = {
+    "board": (Board, "/boards/", "Trello board"),
+    "list": (TrelloList, "/lists", "list"),
+    "card": (Card, "/cards", "card"),
+}
+
+
+class BoardBuildError(Exception):
+    """A plan step failed; the journal keeps every step completed before it."""
+
+
+def plan_layout(board_name, layout, description=None):
+    """Turn a board layout of (list name, card names) pairs into ordered steps, each naming the step that creates its parent."""
+    steps = [{"kind": "board", "name": board_name, "desc": description}]
+    for list_number, (list_name, card_names) in enumerate(layout, 1):
+        steps.append({"kind": "list", "name": list_name, "parent": 0, "pos": list_number * POSITION_STEP})
+        list_step = len(steps) - 1
+        for card_number, card_name in enumerate(card_names, 1):
+            steps.append({"kind": "card", "name": card_name, "parent": list_step, "pos": card_number * POSITION_STEP})
+    return steps
+
+
+def plan_board(board_name, description=None, list_names=(), card_names=()):
+    """Plan a create-board request, where every list gets the same cards."""
+    return plan_layout(board_name, [(list_name, card_names) for list_name in list_names], description)
+
+
+def plan_board_copy(board_name, source_board_id, description=None):
+    """Plan a board copied server-side from another board, lists and cards included, in one request."""
+    return [{"kind": "board", "name": board_name, "desc": description, "source": source_board_id}]
+
+
+class BoardJournal:
+    """Records plans and the objects created for each step in SQLite, keyed by idempotency key."""
+
+    def __init__(self, path):
+        self.path = path
+        self._locks = defaultdict(threading.Lock)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS board_plans (key TEXT PRIMARY KEY, plan BLOB, status TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS board_steps (key TEXT, step INTEGER, object BLOB, PRIMARY KEY (key, step))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def lock(self, key):
+        """Lock held while a key's plan runs, so concurrent retries don't both execute it."""
+        return self._locks[key]
+
+    def load_plan(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT plan, status FROM board_plans WHERE key = ?", (key,)).fetchone()
+        return (orjson.loads(row[0]), row[1]) if row else (None, None)
+
+    def save_plan(self, key, plan):
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO board_plans VALUES (?, ?, 'pending')", (key, orjson.dumps(plan)))
+
+    def set_status(self, key, status):
+        with self._connect() as db:
+            db.execute("UPDATE board_plans SET status = ? WHERE key = ?", (status, key))
+
+    def completed(self, key):
+        """Map of step index to the object created for it."""
+        with self._connect() as db:
+            rows = db.execute("SELECT step, object FROM board_steps WHERE key = ?", (key,)).fetchall()
+        return {step: orjson.loads(obj) for step, obj in rows}
+
+    def record(self, key, step, obj):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO board_steps VALUES (?, ?, ?)", (key, step, orjson.dumps(asdict(obj))))
+
+    def forget(self, key):
+        with self._connect() as db:
+            db.execute("DELETE FROM board_steps WHERE key = ?", (key,))
+            db.execute("DELETE FROM board_plans WHERE key = ?", (key,))
+
+
+def execute_plan(journal, key, plan, auth, limiter, rollback=False):
+    """Run a plan, skipping steps the journal already completed.
+
+    Steps run as soon as the step creating their parent is done, so the lists of a board and
+    the cards of each list are created concurrently, all through the account's rate limiter
+    and retried when Trello still answers 429. Returns the created board, lists and
+    cards. On failure raises BoardBuildError; the journal is kept so a retry with the same key
+    resumes, unless rollback deletes the board.
+    """
+    with journal.lock(key):
+        journal.save_plan(key, plan)
+        done = journal.completed(key)
+
+        def make_task(index, step):
+            model, path, label = STEP_KINDS[step["kind"]]
+
+            def create(parents):
+                if index in done:
+                    return model(**done[index])
+
+                params = {"name": step["name"], **auth}
+                if "pos" in step:
+                    params["pos"] = step["pos"]
+                if step["kind"] == "board":
+                    params["desc"] = step.get("desc")
+                    if step.get("source"):
+                        params["idBoardSource"] = step["source"]
+                        params["keepFromSource"] = "cards"
+                elif step["kind"] == "list":
+                    params["idBoard"] = parents[step["parent"]].id
+                else:
+                    params["idList"] = parents[step["parent"]].id
+
+                response = send("POST", TRELLO_URL + path, params, limiter)
+                if response.status_code != 200:
+                    raise BoardBuildError(f"Failed to create {label}. {response.text}")
+
+                obj = decode(model, response.content)
+                journal.record(key, index, obj)
+                return obj
+
+            deps = [step["parent"]] if "parent" in step else []
+            return deps, create
+
+        created, errors = run_dag({index: make_task(index, step) for index, step in enumerate(plan)},
+                                  max_workers=PLAN_CONCURRENCY)
+        if errors:
+            if rollback and 0 in created:
+                # Deleting the board removes every list and card created under it
+                send("DELETE", f"{TRELLO_URL}/boards/{created[0].id}", auth, limiter)
+                journal.forget(key)
+            # Report the first step that actually failed rather than the ones it skipped
+            first = min(errors, key=lambda index: (isinstance(errors[index], DependencyFailed), index))
+            error = errors[first]
+            raise error if isinstance(error, BoardBuildError) else BoardBuildError(str(error))
+
+        journal.set_status(key, "done")
+
+    board = created[0]
+    lists = [created[i] for i, step in enumerate(plan) if step["kind"] == "list"]
+    cards = [created[i] for i, step in enumerate(plan) if step["kind"] == "card"]
+    return board, lists, cards
@@ -0,0 +1,135 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import orjson
+
+from resilience import trello
+
+TRELLO_URL = "https://api.trello.com/1"
+
+# Card requests in flight at once when a change has to be applied card by card
+BULK_CONCURRENCY = 8
+
+# Times a card request is retried after Trello answers 429
+RATE_LIMIT_RETRIES = 3
+
+OPERATIONS = ("archive", "move", "update", "label")
+
+
+class BulkError(Exception):
+    """A bulk operation could not start, e.g. its cards could not be listed."""
+
+
+def select_cards(list_id, auth, label=None):
+    """Ids of the open cards in a list, optionally only those carrying a label (by name or id)."""
+    params = {"fields": "id,labels", **auth}
+    response = trello.get(f"{TRELLO_URL}/lists/{list_id}/cards", params=params)
+    if response.status_code != 200:
+        raise BulkError(f"Failed to fetch cards of list {list_id}. {response.text}")
+    cards = orjson.loads(response.content)
+    if label:
+        wanted = label.lower()
+        cards = [card for card in cards
+                 if any(wanted in (l["id"].lower(), (l.get("name") or "").lower()) for l in card.get("labels", []))]
+    return [card["id"] for card in cards]
+
+
+def card_request(operation, card_id, auth, target_list_id=None, target_board_id=None, fields=None, label_id=None):
+    """The (method, url, params, change) applying an operation to one card; change is the resulting card delta."""
+    if operation == "archive":
+        change = {"closed": True}
+    elif operation == "move":
+        change = {"idList": target_list_id}
+        if target_board_id:
+            change["idBoard"] = target_board_id
+    elif operation == "update":
+        change = dict(fields or {})
+    else:
+        return "POST", f"{TRELLO_URL}/cards/{card_id}/idLabels", {"value": label_id, **auth}, {"id": card_id}
+    return "PUT", f"{TRELLO_URL}/cards/{card_id}", {**change, **auth}, {"id": card_id, **change}
+
+
+def send(method, url, params, limiter):
+    """Send one request through the rate limiter, backing off when Trello still answers 429."""
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        response = trello.request(method, url, params=params)
+        if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+            return response
+        time.sleep(float(response.headers.get("Retry-After", 2 ** attempt)))
+
+
+def bulk_cards(operation, auth, limiter, list_id=None, card_ids=None, label=None, target_list_id=None,
+               target_board_id=None, fields=None, label_id=None, progress=None, on_change=None):
+    """Archive, move, update or label many cards.
+
+    Whole-list archives and moves use Trello's list-level endpoints, one request besides listing
+    the cards; anything narrower fans out one request per card under the rate limiter.
+    progress(done, total) is called as cards complete and on_change(card delta) for every card
+    changed, including each card of a whole list.
+    """
+    if operation not in OPERATIONS:
+        raise BulkError(f"Unknown bulk operation '{operation}'.")
+    if operation == "move" and not target_list_id:
+        raise BulkError("Moving cards needs a target list.")
+    if operation == "label" and not label_id:
+        raise BulkError("Labelling cards needs a label_id.")
+
+    whole_list = list_id and not card_ids and not label
+    if whole_list and operation in ("archive", "move"):
+        # The list-level endpoints don't say which cards they changed, so they're listed first
+        card_ids = select_cards(list_id, auth)
+        request_count = 2
+        if operation == "archive":
+            change = {"closed": True}
+            response = send("POST", f"{TRELLO_URL}/lists/{list_id}/archiveAllCards", auth, limiter)
+        else:
+            if not target_board_id:
+                board = send("GET", f"{TRELLO_URL}/lists/{target_list_id}", {"fields": "idBoard", **auth}, limiter)
+                if board.status_code != 200:
+                    raise BulkError(f"Failed to find target list {target_list_id}. {board.text}")
+                target_board_id = orjson.loads(board.content)["idBoard"]
+                request_count += 1
+            change = {"idList": target_list_id, "idBoard": target_board_id}
+            response = send("POST", f"{TRELLO_URL}/lists/{list_id}/moveAllCards", {**change, **auth}, limiter)
+        if response.status_code != 200:
+            raise BulkError(f"Failed to {operation} the cards of list {list_id}. {response.text}")
+        if on_change:
+            for card_id in card_ids:
+                on_change({"id": card_id, **change})
+        return {"operation": operation, "method": "list", "requests": request_count, "total": len(card_ids),
+                "succeeded": len(card_ids), "failed": []}
+
+    if not card_ids:
+        if not list_id:
+            raise BulkError("A bulk operation needs card_ids or a list_id.")
+        card_ids = select_cards(list_id, auth, label)
+
+    total = len(card_ids)
+    done, failed = 0, []
+    if progress:
+        progress(0, total)
+
+    def apply(card_id):
+        method, url, params, change = card_request(operation, card_id, auth, target_list_id, target_board_id,
+                                                   fields, label_id)
+        response = send(method, url, params, limiter)
+        if response.status_code != 200:
+            raise BulkError(response.text)
+        return change
+
+    with ThreadPoolExecutor(max_workers=BULK_CONCURRENCY) as pool:
+        futures = {pool.submit(apply, card_id): card_id for card_id in card_ids}
+        for future in as_completed(futures):
+            try:
+                change = future.result()
+                if on_change:
+                    on_change(change)
+            except Exception as e:
+                failed.append({"id": futures[future], "error": str(e)})
+            done += 1
+            if progress:
+                progress(done, total)
+
+    return {"operation": operation, "method": "per-card", "requests": total, "total": total,
+            "succeeded": total - len(failed), "failed": failed}
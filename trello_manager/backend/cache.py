@@ -0,0 +1,201 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class CachedResponse:
+    """The parts of a requests.Response the backend reads, served from the read cache."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def close(self):
+        pass
+
+
+class ReadCache:
+    """LRU cache of Trello GET bodies with a TTL, invalidated or patched by tag.
+
+    Tags name what a body depends on: "member" for the member's boards, "board:<id>" for a
+    board's lists, "list:<id>" for a list's cards and "card:<id>" for a card's sub-resources.
+    """
+
+    def __init__(self, ttl, max_entries=2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, content, tags)
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "invalidated": 0, "patched": 0}
+
+    def get(self, key, stale=False):
+        """The cached body for key, or None; with stale=True expired bodies not yet evicted count too."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] < time.monotonic() and not stale):
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["stale" if entry[0] < time.monotonic() else "hits"] += 1
+            return CachedResponse(200, entry[1])
+
+    def put(self, key, content, tags, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), content, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags):
+        """Drop every body that depends on any of the tags."""
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+        return len(stale)
+
+    def patch(self, tag, delta):
+        """Update the object with delta["id"] in place inside every array body tagged `tag`.
+
+        Only keys the cached object already has are changed, so field-projected bodies keep their
+        shape. Bodies that don't contain the object are left alone.
+        """
+        with self._lock:
+            for key, (expires, content, tags) in list(self._entries.items()):
+                if tag not in tags:
+                    continue
+                items = orjson.loads(content)
+                if not isinstance(items, list):
+                    continue
+                for item in items:
+                    if isinstance(item, dict) and item.get("id") == delta["id"]:
+                        item.update({name: value for name, value in delta.items() if name in item})
+                        self._entries[key] = (expires, orjson.dumps(items), tags)
+                        self.stats["patched"] += 1
+                        break
+
+    def refresh(self, keys):
+        """Serve these bodies, where still cached, for another full TTL."""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry:
+                    self._entries[key] = (max(entry[0], expires), entry[1], entry[2])
+
+    def drop(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def tags(self):
+        """Every tag some cached body depends on."""
+        with self._lock:
+            return set().union(*(tags for _, _, tags in self._entries.values()))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheCheckpoint:
+    """Snapshot of a ReadCache in SQLite, so a restarted backend starts with the reads it had.
+
+    Credentials are stripped from the saved keys and put back on restore, and a snapshot is only
+    restored for the credentials that saved it. Expired bodies still held are saved too: `cursor`
+    is when the oldest saved body was fetched, and the Trello actions after it are replayed onto
+    the restored cache before it is used, whatever the TTL.
+    """
+
+    VERSION = 2
+
+    # Subtracted from the cursor in case this clock runs ahead of Trello's
+    CLOCK_SKEW = 60
+
+    def __init__(self, path, secret_params=("key", "token")):
+        self.path = path
+        self.secret_params = secret_params
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS read_cache (key BLOB PRIMARY KEY, content BLOB, tags BLOB, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS read_cache_meta (key TEXT PRIMARY KEY, value)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    @staticmethod
+    def owner(auth):
+        return hashlib.sha256(orjson.dumps(auth, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def save(self, cache, auth):
+        """Replace the snapshot with the cache's entries; returns how many were saved."""
+        now, wall = time.monotonic(), time.time()
+        with cache._lock:
+            entries = [(key, content, tags, wall + expires - now) for key, (expires, content, tags) in cache._entries.items()]
+
+        rows = []
+        for (url, params), content, tags, expires in entries:
+            params = [(name, value) for name, value in params if name not in self.secret_params]
+            rows.append((orjson.dumps([url, params]), content, orjson.dumps(sorted(tags)), expires))
+
+        fetched = min((expires for *_, expires in rows), default=wall + cache.ttl) - cache.ttl - self.CLOCK_SKEW
+        cursor = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(fetched))
+        meta = {"version": self.VERSION, "owner": self.owner(auth), "cursor": cursor, "saved_at": wall}
+        with self._connect() as db:
+            db.execute("DELETE FROM read_cache")
+            db.executemany("INSERT OR REPLACE INTO read_cache VALUES (?, ?, ?, ?)", rows)
+            db.executemany("INSERT OR REPLACE INTO read_cache_meta VALUES (?, ?)", meta.items())
+        return len(rows)
+
+    def cursor(self, auth):
+        """When the oldest body of a snapshot usable with these credentials was fetched, as an ISO date, or None."""
+        with self._connect() as db:
+            meta = dict(db.execute("SELECT key, value FROM read_cache_meta").fetchall())
+        if meta.get("version") != self.VERSION or meta.get("owner") != self.owner(auth):
+            return None
+        return meta.get("cursor")
+
+    def restore(self, cache, auth):
+        """Load the well-formed entries of the snapshot into the cache, expired; returns their keys.
+
+        Until the caller has checked them against the actions since the cursor and refreshed them,
+        restored bodies are only served as stale ones while Trello is failing.
+        """
+        if self.cursor(auth) is None:
+            return []
+        expired = time.monotonic() - 1
+        with self._connect() as db:
+            rows = db.execute("SELECT key, content, tags FROM read_cache ORDER BY expires DESC LIMIT ?",
+                              (cache.max_entries,)).fetchall()
+
+        restored = []
+        for key, content, tags in reversed(rows):
+            try:
+                url, params = orjson.loads(key)
+                orjson.loads(content)  # Drop bodies that were cut short or corrupted
+            except orjson.JSONDecodeError:
+                continue
+            key = (url, tuple(sorted([(name, value) for name, value in params] + list(auth.items()))))
+            with cache._lock:
+                # A body fetched since startup is newer than the snapshot's
+                if key not in cache._entries:
+                    cache._entries[key] = (expired, content, frozenset(orjson.loads(tags)))
+                    restored.append(key)
+        return restored
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM read_cache")
+            db.execute("DELETE FROM read_cache_meta")
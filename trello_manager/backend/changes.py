@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+
+import orjson
+
+# Plural keys used in /changes responses
+COLLECTIONS = {"board": "boards", "list": "lists", "card": "cards"}
+
+
+class ChangeLog:
+    """Persistent, numbered log of board/list/card changes that clients sync from with a cursor.
+
+    Sequence numbers are shared by all accounts; each account reads only its own rows, and rows
+    with no account belong to the default one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, object_id TEXT, change TEXT, data BLOB, time REAL)""")
+            db.execute("CREATE TABLE IF NOT EXISTS change_log_meta (key TEXT PRIMARY KEY, value)")
+            columns = [row[1] for row in db.execute("PRAGMA table_info(change_log)")]
+            if "account" not in columns:
+                # Logs from before accounts keep their rows, which belong to the default account
+                db.execute("ALTER TABLE change_log ADD COLUMN account TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def append(self, object_type, change, data, when, account=None):
+        """Store a change and return its sequence number."""
+        with self._lock, self._connect() as db:
+            cursor = db.execute("INSERT INTO change_log (type, object_id, change, data, time, account) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                (object_type, data["id"], change, orjson.dumps(data), when, account))
+            return cursor.lastrowid
+
+    def last_seq(self, db=None):
+        if db is None:
+            with self._connect() as db:
+                return self.last_seq(db)
+        row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        return row[0] if row else 0
+
+    def pruned_through(self):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM change_log_meta WHERE key = 'pruned_through'").fetchone()
+        return row[0] if row else 0
+
+    def prune(self, before):
+        """Drop changes older than the `before` timestamp; cursors pointing into them must resync."""
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT MAX(seq) FROM change_log WHERE time < ?", (before,)).fetchone()
+            if row[0]:
+                db.execute("DELETE FROM change_log WHERE seq <= ?", (row[0],))
+                db.execute("INSERT OR REPLACE INTO change_log_meta VALUES ('pruned_through', ?)", (row[0],))
+
+    def since(self, cursor, limit=5000, account=None):
+        """Collapse an account's changes after `cursor` into the latest delta per object plus deleted ids.
+
+        Returns the response body for /changes; `resync` is set when the cursor predates the log,
+        in which case the client has to refetch everything.
+        """
+        if cursor < self.pruned_through():
+            return {"resync": True, "cursor": self.last_seq()}
+
+        # Appends hold the lock, so no change can land between reading the head and the rows up to it
+        with self._lock, self._connect() as db:
+            head = self.last_seq(db)
+            rows = db.execute("SELECT seq, type, object_id, change, data FROM change_log "
+                              "WHERE seq > ? AND seq <= ? AND account IS ? ORDER BY seq LIMIT ?",
+                              (cursor, head, account, limit)).fetchall()
+        has_more = len(rows) == limit
+
+        updated = {name: {} for name in COLLECTIONS.values()}
+        deleted = {name: set() for name in COLLECTIONS.values()}
+        for seq, object_type, object_id, change, data in rows:
+            name = COLLECTIONS[object_type]
+            if change == "deleted":
+                updated[name].pop(object_id, None)
+                deleted[name].add(object_id)
+            else:
+                # Later deltas overwrite the fields they carry
+                updated[name].setdefault(object_id, {}).update(orjson.loads(data))
+                deleted[name].discard(object_id)
+
+        return {
+            **{name: list(objs.values()) for name, objs in updated.items()},
+            "deleted": {name: sorted(ids) for name, ids in deleted.items()},
+            # Without more rows, every change up to the head has been seen, other accounts' included
+            "cursor": rows[-1][0] if has_more else max(cursor, head),
+            "has_more": has_more,
+            "resync": False,
+        }
@@ -0,0 +1,44 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class DependencyFailed(Exception):
+    """A task was skipped because a task it depends on failed."""
+
+
+def run_dag(tasks, max_workers=8):
+    """Run tasks as soon as their dependencies finish, up to max_workers at a time.
+
+    tasks maps a name to (dependency names, fn); fn is called with a dict of its dependencies'
+    results. Returns (results, errors), both keyed by task name; dependents of a failed task
+    are not run and get a DependencyFailed error. Tasks run in a copy of the caller's context, so
+    context variables such as the current account and priority carry over.
+    """
+    pending = dict(tasks)
+    results, errors = {}, {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, (deps, fn) in list(pending.items()):
+                failed = [dep for dep in deps if dep in errors]
+                if failed:
+                    errors[name] = DependencyFailed(f"Skipped because step {failed[0]} failed.")
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, fn, {dep: results[dep] for dep in deps})] = name
+                    del pending[name]
+
+            if not running:
+                break  # Whatever is left waits on a missing task or a cycle
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+
+    for name in pending:
+        errors[name] = DependencyFailed(f"Step {name} depends on a step that does not exist.")
+    return results, errors
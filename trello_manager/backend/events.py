@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Trello action types that change boards, lists or cards, mapped to (object type, change)
+ACTION_EVENTS = {
+    "createBoard": ("board", "created"),
+    "updateBoard": ("board", "updated"),
+    "deleteBoard": ("board", "deleted"),
+    "createList": ("list", "created"),
+    "updateList": ("list", "updated"),
+    "moveListToBoard": ("list", "updated"),
+    "createCard": ("card", "created"),
+    "copyCard": ("card", "created"),
+    "updateCard": ("card", "updated"),
+    "moveCardToBoard": ("card", "updated"),
+    "deleteCard": ("card", "deleted"),
+}
+
+
+def action_to_event(action):
+    """Turn a Trello action into (object type, change, object delta), or None if it changes nothing we show."""
+    kind = ACTION_EVENTS.get(action.get("type"))
+    if not kind:
+        return None
+    object_type, change = kind
+    data = action.get("data", {})
+    obj = dict(data.get(object_type) or {})
+    if not obj.get("id"):
+        return None
+
+    # Actions carry the object's changed fields; add the parent ids the client files it under
+    if object_type == "card":
+        parent = data.get("listAfter") or data.get("list")
+        if parent:
+            obj["idList"] = parent["id"]
+    elif object_type == "list" and data.get("board"):
+        obj.setdefault("idBoard", data["board"]["id"])
+    return object_type, change, obj
+
+
+class EventBus:
+    """Fans board/list/card change events out to SSE and WebSocket subscribers.
+
+    Events are numbered so a reconnecting client can ask for everything after the last one it saw,
+    as long as it is still in the in-memory history. With a change log, events are also persisted
+    and take their numbers from it, so SSE ids and /changes cursors are interchangeable. Each event
+    belongs to an account partition, and subscribers only see their own account's events.
+    """
+
+    def __init__(self, history=1000, queue_size=1000, log=None):
+        self._lock = threading.Lock()
+        self._log = log
+        self._seq = log.last_seq() if log else 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._seen_actions = OrderedDict()
+        self.queue_size = queue_size
+
+    def publish(self, object_type, change, data, account=None):
+        """Record an event and deliver it to the account's subscribers; safe to call from any thread."""
+        with self._lock:
+            now = time.time()
+            self._seq = self._log.append(object_type, change, data, now, account) if self._log else self._seq + 1
+            event = {"seq": self._seq, "type": object_type, "change": change, "data": data, "time": now,
+                     "account": account}
+            self._history.append(event)
+            subscribers = [(loop, queue) for loop, queue, subscribed in self._subscribers if subscribed == account]
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+        return event
+
+    def publish_action(self, action, account=None, remember=10000):
+        """Publish a Trello action once per account, however many times polling and webhooks deliver it.
+
+        Returns False for actions already seen.
+        """
+        seen = (account, action["id"])
+        with self._lock:
+            if seen in self._seen_actions:
+                return False
+            self._seen_actions[seen] = True
+            if len(self._seen_actions) > remember:
+                self._seen_actions.popitem(last=False)
+        event = action_to_event(action)
+        if event:
+            self.publish(*event, account=account)
+        return True
+
+    @staticmethod
+    def _offer(queue, event):
+        if queue.full():
+            # The client fell too far behind to catch up from deltas
+            while not queue.empty():
+                queue.get_nowait()
+            event = {"seq": event["seq"], "type": "resync", "change": None, "data": None, "time": event["time"],
+                     "account": event["account"]}
+        queue.put_nowait(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    async def subscribe(self, after=None, account=None):
+        """Yield an account's events as they are published, first replaying those after `after` when given."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue, account)
+        with self._lock:
+            backlog = [event for event in self._history
+                       if after is not None and event["seq"] > after and event["account"] == account]
+            missed = not self._history or self._history[0]["seq"] > after + 1 if after is not None else False
+            if missed and after < self._seq:
+                # Some events after the client's cursor are no longer in memory
+                backlog = [{"seq": self._seq, "type": "resync", "change": None, "data": None, "time": time.time(),
+                            "account": account}]
+            self._subscribers.add(subscriber)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                yield await queue.get()
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+def poll_actions(on_action, fetch_actions, interval, stop):
+    """Pass new Trello actions to on_action, oldest first, every `interval` seconds.
+
+    fetch_actions(since) returns actions newest first, after action id `since` when given.
+    """
+    since = None
+    while not stop.wait(interval):
+        try:
+            actions = fetch_actions(since)
+        except Exception as e:
+            print(f"Failed to poll Trello actions: {str(e)}")
+            continue
+        if not actions:
+            continue
+        if since is not None:
+            for action in reversed(actions):
+                on_action(action)
+        since = actions[0]["id"]
@@ -0,0 +1,57 @@
+import datetime
+
+
+def index_metadata(space="cosine", m=16, construction_ef=100, search_ef=50):
+    """Chroma collection metadata setting the HNSW distance function and graph parameters.
+
+    Larger m and construction_ef build a denser, slower-to-build graph with better recall;
+    search_ef trades query latency for recall. See benchmarks/retrieval.py for measurements.
+    """
+    return {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef}
+
+
+def open_collection(client, name, metadata, create=True):
+    """Get a collection, creating it with the index metadata when it doesn't exist yet, or returning None without create.
+
+    Chroma fixes the space and graph parameters when a collection is created, so an existing
+    collection keeps its own; a mismatch is reported and applies after the collection is rebuilt.
+    """
+    try:
+        collection = client.get_collection(name=name)
+    except Exception:
+        return client.create_collection(name=name, metadata=metadata) if create else None
+
+    current = collection.metadata or {}
+    changed = {key: value for key, value in metadata.items() if current.get(key) != value}
+    if changed:
+        print(f"Collection '{name}' keeps its index settings, {changed} applies once it is rebuilt")
+    return collection
+
+
+def relevance(distance):
+    """Map a distance in any Chroma space (l2, ip, cosine) onto (0, 1], higher meaning closer."""
+    return 1 / (1 + max(distance, 0.0))
+
+
+def rerank_by_recency(documents, metadatas, distances, weight, half_life_days, now=None):
+    """Reorder query results by a blend of relevance and recency of their `timestamp` metadata.
+
+    The recency of an entry halves every half_life_days; weight 0 keeps Chroma's order and 1 sorts
+    by age alone. Entries without a timestamp count as old.
+    """
+    now = now or datetime.datetime.now()
+    metadatas = metadatas or [{}] * len(documents)
+    scored = []
+    for index, (document, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
+        recency = 0.0
+        timestamp = (metadata or {}).get("timestamp")
+        if timestamp:
+            try:
+                age_days = (now - datetime.datetime.fromisoformat(timestamp)).total_seconds() / 86400
+                recency = 0.5 ** (max(age_days, 0.0) / half_life_days)
+            except ValueError:
+                pass
+        score = (1 - weight) * relevance(distance) + weight * recency
+        scored.append((-score, index, document, metadata))
+    scored.sort()
+    return [document for _, _, document, _ in scored], [metadata for _, _, _, metadata in scored]
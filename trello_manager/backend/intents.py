@@ -0,0 +1,194 @@
+import re
+
+
+def tokenize(text, nlp=None):
+    """Token texts of `text`; spaCy's tokenizer alone when a pipeline is given, a regex otherwise."""
+    if nlp is None:
+        return re.findall(r"\w+|[^\w\s]", text)
+    return [token.text for token in nlp.make_doc(text)]
+
+def detect_action(text, nlp=None):
+    """Detects if the user is trying to create, update, or delete an object."""
+    action_patterns = {
+        "create": [["create"], ["add"], ["make"], ["new"]],
+        "delete": [["delete"], ["remove"], ["erase"]],
+        "update": [["update"], ["change"], ["modify"]],
+        "archive": [["archive"]],
+        "move": [["move"]],
+        "list": [["list"], ["show"], ["view"]],
+    }
+
+    # Only tokens are compared, so the tokenizer is enough; running the full pipeline here cost one transformer pass per pattern
+    text_tokens = set(tokenize(text.lower(), nlp))
+    for action, patterns in action_patterns.items():
+        for pattern in patterns:
+            if all(word in text_tokens for word in pattern):
+                return action
+    return "unknown"
+
+def detect_object(text, nlp=None):
+    """Detects if the user is referring to a board, list, or card."""
+    object_patterns = {
+        "board": ["board", "boards"],  # Simplified to allow partial matching
+        "list": ["list", "lists"],
+        "card": ["card", "cards"],
+    }
+
+    # Lowercase the input text for case-insensitive matching
+    text_tokens = tokenize(text.lower(), nlp)  # Extract tokens from the input text
+
+    # Check for object patterns in the input text
+    for obj, patterns in object_patterns.items():
+        for pattern in patterns:
+            if pattern in text_tokens:
+                return obj
+    return "unknown"
+
+# Questions counting the member's cards, answered from the board snapshot without the LLM. They have to
+# ask about cards explicitly, e.g. "how many cards ...", "overdue cards", "cards per label"
+CARD_QUESTIONS = (
+    r"\b(?:how\s+many|number\s+of|count(?:\s+of)?)\b[^?.!]*?\bcards?\b",
+    r"\b(?:overdue|late|past[\s-]+due)\s+cards?\b",
+    r"\bcards?\s+(?:(?:that|which)\s+)?(?:are\s+)?(?:overdue|late|past[\s-]+due)\b",
+    r"\bcards?\s+(?:per|by|for\s+each|in\s+each|on\s+each)\s+(?:board|list|label|member)s?\b",
+    r"\b(?:(?:which|what)\s+(?:board|list|label|member)s?|who)\b[^?.!]*?\b(?:most|fewest|least)\b[^?.!]*?\bcards?\b",
+)
+
+# "How many cards can a board hold?" asks about Trello rather than the member's cards
+CAPABILITY_QUESTION = r"\b(?:can|could|may|might|should|allowed|limit|maximum|max)\b"
+
+OVERDUE = r"\b(?:overdue|late|past[\s-]+due)\b"
+
+def detect_analytics(text, object_type=None):
+    """What a question counting cards asks for, as {"metric", "group", "ascending"}, or None.
+
+    The group is what the counts are broken down by, e.g. "per list" or "which board"; counts per
+    label or member are the "labels" and "workload" metrics. Anything else is left to the LLM.
+    """
+    if not any(re.search(pattern, text, re.IGNORECASE) for pattern in CARD_QUESTIONS):
+        return None
+    if re.search(CAPABILITY_QUESTION, text, re.IGNORECASE):
+        return None
+    group_match = re.search(r"\b(?:per|by|each|every|which|what)\s+(board|list|label|member)s?\b", text, re.IGNORECASE)
+    if group_match:
+        group = group_match.group(1).lower()
+    elif re.search(r"\bwho\b", text, re.IGNORECASE):
+        group = "member"
+    else:
+        group = "list" if object_type == "list" else "board"
+    metric = {"label": "labels", "member": "workload"}.get(group)
+    if not metric:
+        metric = "overdue" if re.search(OVERDUE, text, re.IGNORECASE) else "count"
+    return {"metric": metric, "group": group,
+            "ascending": bool(re.search(r"\b(?:fewest|least)\b", text, re.IGNORECASE))}
+
+def extract_entities(text, nlp=None, doc=None, entities=None):
+    """Extracts key details (action type, object type, name, lists) from user input using spaCy.
+
+    Pass `doc` when it was already produced, e.g. by nlp.pipe, or `entities` as (text, label)
+    pairs from another NER backend; without either only the rule-based fields are filled.
+    """
+    if entities is None:
+        if doc is None and nlp is not None:
+            doc = nlp(text)
+        entities = [(ent.text, ent.label_) for ent in doc.ents] if doc is not None else []
+    extracted_info = {
+        "action_type": None,
+        "object_type": None,
+        "name": None,
+        "description": None,
+        "lists": [],
+        "cards": [],
+        "template": None,
+        "source_list": None,
+        "target_list": None,
+        "label": None,
+        "board": None,
+        "new_label": None,
+        "fields": None,
+        "analytics": None,
+        "other_parameters": {}
+    }
+
+    # Detect Named Entities (NER)
+    for ent_text, ent_label in entities:
+        if ent_label in ["ORG", "PRODUCT"]:  # Trello objects often classified under ORG/PRODUCT
+            extracted_info["name"] = ent_text
+        elif ent_label == "DATE":
+            extracted_info["other_parameters"]["due_date"] = ent_text
+        elif ent_label == "PERSON":
+            extracted_info["other_parameters"]["member"] = ent_text
+
+    # Rule-based intent detection for action and object
+    extracted_info["action_type"] = detect_action(text, nlp)
+    extracted_info["object_type"] = detect_object(text, nlp)
+
+    # Questions like "how many overdue cards per list?" list an aggregate of the member's boards
+    if extracted_info["action_type"] in ("list", "unknown"):
+        extracted_info["analytics"] = detect_analytics(text, extracted_info["object_type"])
+        if extracted_info["analytics"]:
+            extracted_info["action_type"] = "list"
+ 
+    # If no board name is extracted, attempt to infer it based on object_type
+    if not extracted_info["name"] and extracted_info["object_type"] == "board":
+        # Try to find pattern: "board [name]" or "board called [name]"
+        board_name_match = re.search(r"board\s+(?:called\s+)?(\w+)", text, re.IGNORECASE)
+        if board_name_match:
+            extracted_info["name"] = board_name_match.group(1)
+            
+    # Extract the template to copy from, e.g. "create board Q3 from template scrum"
+    template_match = re.search(r"(?:from|using)\s+(?:the\s+)?template\s+[\"']?([\w-]+)", text, re.IGNORECASE)
+    if template_match:
+        extracted_info["template"] = template_match.group(1)
+
+    # Extract the lists and label of bulk card commands, e.g. "move every card labelled urgent from Doing to Today"
+    source_match = re.search(r"\b(?:in|from)\s+(?:the\s+)?(?:list\s+)?[\"']?(\w[\w -]*?)[\"']?(?=\s+(?:to|into|onto)\b|\s*[.,]|$)", text, re.IGNORECASE)
+    if source_match:
+        extracted_info["source_list"] = source_match.group(1)
+    target_match = re.search(r"\b(?:to|into|onto)\s+(?:the\s+)?(?:list\s+)?[\"']?(\w[\w -]*?)[\"']?(?=\s*[.,]|$)", text, re.IGNORECASE)
+    if target_match:
+        extracted_info["target_list"] = target_match.group(1)
+    label_match = re.search(r"\b(?:label(?:l)?ed|with\s+(?:the\s+)?label)\s+[\"']?([\w-]+)", text, re.IGNORECASE)
+    if label_match:
+        extracted_info["label"] = label_match.group(1)
+
+    # Bulk label and update commands, e.g. "add label urgent to all cards in Doing", "mark every card in Done as complete"
+    apply_label = re.search(r"\b(?:add|apply|put)\s+(?:the\s+)?label\s+[\"']?([\w-]+)[\"']?\s+(?:to|on)\s+"
+                            r"(?:all|every|each)\s+(?:the\s+)?cards?\b", text, re.IGNORECASE)
+    if apply_label:
+        extracted_info["action_type"] = "label"
+        extracted_info["new_label"] = apply_label.group(1)
+    mark_match = re.search(r"\bmark\s+(?:all|every|each)\s+(?:the\s+)?cards?\s+(?:in|from)\s+(?:the\s+)?(?:list\s+)?"
+                           r"[\"']?(\w[\w -]*?)[\"']?\s+as\s+(complete|done|incomplete|not\s+done)\b", text, re.IGNORECASE)
+    if mark_match:
+        extracted_info["action_type"] = "update"
+        extracted_info["source_list"] = mark_match.group(1)
+        done = mark_match.group(2).lower() in ("complete", "done")
+        extracted_info["fields"] = {"dueComplete": "true" if done else "false"}
+
+    # The board the lists of a bulk command are on, e.g. "archive all cards in Done on board Sprint"
+    board_suffix = r"\s+(?:on|in|from)\s+(?:the\s+)?board\s+[\"']?(\w[\w-]*)[\"']?"
+    board_match = re.search(board_suffix, text, re.IGNORECASE)
+    if board_match:
+        extracted_info["board"] = board_match.group(1)
+        for name in ("source_list", "target_list"):
+            if extracted_info[name]:
+                extracted_info[name] = re.split(board_suffix, extracted_info[name], flags=re.IGNORECASE)[0] or None
+
+    # Extract lists from user input (if present)
+    list_match = re.search(r"lists?(?:\s*:\s*|\s+with\s+)?(.*)", text, re.IGNORECASE)
+    if list_match:
+        list_text = list_match.group(1)
+        # Clean up potential numeric prefixes like "2 lists:"
+        list_text = re.sub(r"^\d+\s+lists?(?:\s*:\s*)?", "", list_text)
+        # The cards section that may follow isn't part of the lists, e.g. "lists: A, B and add cards: C"
+        list_text = re.split(r"(?:,|\band)?\s*\b(?:(?:add|with)\s+)?cards?\s*:", list_text, flags=re.IGNORECASE)[0]
+        extracted_info["lists"] = [name.strip() for name in re.split(r",|\band\b", list_text) if name.strip()]
+        
+    # Extract cards from user input (if present)
+    card_match = re.search(r"cards?:\s*(.*)", text, re.IGNORECASE)  # Find cards section
+    if card_match:
+        card_text = card_match.group(1)
+        extracted_info["cards"] = [name.strip() for name in re.split(r",|\band\b", card_text) if name.strip()]
+
+    return extracted_info
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+
+class JobQueue:
+    """Runs background jobs on a bounded thread pool per job kind, persisting each job in SQLite."""
+
+    def __init__(self, path, concurrency):
+        self.path = path
+        self._pools = {kind: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{kind}")
+                       for kind, workers in concurrency.items()}
+        self._lock = threading.Lock()
+        self._finished = {}
+        self._callbacks = {}
+        self._progress = {}
+        self.stats = {kind: {"submitted": 0, "completed": 0, "failed": 0, "running": 0,
+                             "queue_seconds": 0.0, "max_queue_seconds": 0.0, "run_seconds": 0.0}
+                      for kind in concurrency}
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT, status TEXT, payload BLOB, result BLOB,
+                created REAL, started REAL, finished REAL)""")
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def submit(self, kind, payload, handler):
+        """Queue handler(payload, progress) as a job of the given kind and return the job id.
+
+        The handler may call progress(done, total) to report how far it got.
+        """
+        job_id = str(uuid.uuid4())
+        with self._connect() as db:
+            db.execute("INSERT INTO jobs (id, kind, status, payload, created) VALUES (?, ?, 'queued', ?, ?)",
+                       (job_id, kind, orjson.dumps(payload), time.time()))
+        self._enqueue(job_id, kind, payload, handler)
+        return job_id
+
+    def _enqueue(self, job_id, kind, payload, handler):
+        with self._lock:
+            self._finished[job_id] = threading.Event()
+            self.stats[kind]["submitted"] += 1
+        self._pools[kind].submit(self._run, job_id, kind, payload, handler)
+
+    def _run(self, job_id, kind, payload, handler):
+        started = time.time()
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (started, job_id))
+            created = db.execute("SELECT created FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        stats = self.stats[kind]
+        with self._lock:
+            stats["running"] += 1
+            stats["queue_seconds"] += started - created
+            stats["max_queue_seconds"] = max(stats["max_queue_seconds"], started - created)
+
+        try:
+            result = handler(payload, lambda done, total: self._report(job_id, done, total))
+            status = "failed" if isinstance(result, dict) and "error" in result else "done"
+        except Exception as e:
+            result, status = {"error": f"Job failed: {str(e)}"}, "failed"
+
+        finished = time.time()
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, result = ?, finished = ? WHERE id = ?",
+                       (status, orjson.dumps(result), finished, job_id))
+        with self._lock:
+            stats["running"] -= 1
+            stats["completed" if status == "done" else "failed"] += 1
+            stats["run_seconds"] += finished - started
+            self._finished.pop(job_id).set()
+            self._progress.pop(job_id, None)
+            callbacks = self._callbacks.pop(job_id, [])
+        for callback in callbacks:
+            callback()
+
+    def _report(self, job_id, done, total):
+        self._progress[job_id] = {"done": done, "total": total}
+
+    def on_finished(self, job_id, callback):
+        """Call callback() from the job's thread once it finishes, or right away if it isn't running here.
+
+        Lets async callers wait for a job without holding a thread.
+        """
+        with self._lock:
+            if job_id in self._finished:
+                self._callbacks.setdefault(job_id, []).append(callback)
+                return
+        callback()
+
+    def get(self, job_id, wait=0):
+        """Return a job's state, first waiting up to `wait` seconds for it to finish."""
+        event = self._finished.get(job_id)
+        if event and wait:
+            event.wait(wait)
+        with self._connect() as db:
+            row = db.execute("SELECT kind, status, result, created, started, finished FROM jobs WHERE id = ?",
+                             (job_id,)).fetchone()
+        if not row:
+            return None
+        kind, status, result, created, started, finished = row
+        return {"id": job_id, "kind": kind, "status": status,
+                "result": orjson.loads(result) if result else None,
+                "queue_seconds": started - created if started else None,
+                "run_seconds": finished - started if finished else None,
+                "progress": self._progress.get(job_id)}
+
+    def owner(self, job_id):
+        """The account partition a job was submitted for, the "account" of its payload; None for the default one."""
+        with self._connect() as db:
+            row = db.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return orjson.loads(row[0]).get("account") if row else None
+
+    def recover(self, handlers):
+        """Requeue jobs a previous process left queued or running, using the handler for each kind.
+
+        Handlers must be safe to repeat.
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT id, kind, payload FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        rows = [row for row in rows if row[1] in handlers and row[1] in self._pools]
+        for job_id, kind, payload in rows:
+            self._enqueue(job_id, kind, orjson.loads(payload), handlers[kind])
+        return len(rows)
+
+    def metrics(self):
+        with self._lock:
+            report = {}
+            for kind, stats in self.stats.items():
+                started = stats["completed"] + stats["failed"] + stats["running"]
+                done = stats["completed"] + stats["failed"]
+                report[kind] = {**stats,
+                                "avg_queue_seconds": stats["queue_seconds"] / started if started else 0.0,
+                                "avg_run_seconds": stats["run_seconds"] / done if done else 0.0}
+            return report
@@ -0,0 +1,76 @@
+import json
+
+import ollama
+
+EXTRACTION_PROMPT = """You are an AI assistant specialized in extracting structured information from user requests related to Trello.
+Extract the following details:
+- Action type: create, list, update, delete, etc.
+- Object type: board, list, card, etc.
+- Name: The name provided for the object.
+- Description: Any description provided.
+- Other parameters: Due dates, labels, members, etc.
+- Lists: A list of names for lists to create. If the user specifies them, extract exactly what they said.
+- Example user input: 'Create a board for Work with lists: Urgent, Pending, Completed'
+- Extracted lists should be: ["Urgent", "Pending", "Completed"]
+- Cards: A list of names for cards to create. If the user specifies them, extract exactly what they said.
+- Example user input: 'Create a board for Work with lists: Urgent and 3 cards: Red, Yellow and Green'
+- Extracted cards should be: ["Red", "Yellow", "Green"]
+
+Ensure lists are **ALWAYS extracted** if the user provides them.
+Ensure cards are **ALWAYS extracted** if the user provides them.
+"""
+
+# JSON schema passed to Ollama's `format`, so every generation decodes into these fields
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action_type": {"type": "string", "enum": ["create", "list", "update", "delete", "unknown"]},
+        "object_type": {"type": "string", "enum": ["board", "list", "card", "unknown"]},
+        "name": {"type": ["string", "null"]},
+        "description": {"type": ["string", "null"]},
+        "lists": {"type": "array", "items": {"type": "string"}},
+        "cards": {"type": "array", "items": {"type": "string"}},
+        "other_parameters": {
+            "type": "object",
+            "properties": {
+                "due_date": {"type": ["string", "null"]},
+                "member": {"type": ["string", "null"]},
+                "labels": {"type": "array", "items": {"type": "string"}},
+            },
+        },
+    },
+    "required": ["action_type", "object_type", "name", "lists", "cards"],
+}
+
+
+def extract_with_llm(text, model, keep_alive=None, schema=True):
+    """Ask the model for the request's fields; returns the decoded dict, or None when it is not valid JSON.
+
+    schema=False sends the free-form prompt alone, which is how extraction worked before and is
+    kept for benchmarking.
+    """
+    response = ollama.chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": EXTRACTION_PROMPT},
+            {"role": "user", "content": text},
+        ],
+        format=EXTRACTION_SCHEMA if schema else None,
+        options={"temperature": 0},
+        keep_alive=keep_alive,
+    )
+    try:
+        extracted = json.loads(response["message"]["content"])
+    except json.JSONDecodeError:
+        return None
+    return extracted if isinstance(extracted, dict) else None
+
+
+def warm_up(models, keep_alive):
+    """Load each model into memory ahead of the first request and keep it resident."""
+    for model in models:
+        try:
+            # An empty prompt only loads the model
+            ollama.generate(model=model, prompt="", keep_alive=keep_alive)
+        except Exception as e:
+            print(f"Failed to warm up {model}: {str(e)}")
@@ -1,22 +1,60 @@
+import asyncio
 import datetime
-from fastapi import Body, FastAPI, Request
+import heapq
+import threading
+import time
+from dataclasses import asdict
+from fastapi import Body, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+import orjson
 import ollama
 import chromadb
 import uuid
 import requests
 import os
+import tempfile
+from urllib.parse import quote
 from dotenv import load_dotenv
 from langsmith import Client
 import spacy
-from spacy.matcher import Matcher
 
 from langchain_core.prompts import ChatPromptTemplate
-  # Parse the JSON response
-import json
+from accounts import Account, AccountError, AccountRegistry, account_id, current_account
+from analytics import AnalyticsError, aggregate, describe, load_snapshot
+from admission import PRIORITY_ANSWER, PRIORITY_BACKGROUND, AdmissionPool, Overloaded, current_priority
+from archive import ArchiveError, export_board, import_board
+from board_builder import BoardBuildError, BoardJournal, execute_plan, plan_board, plan_board_copy, plan_layout
+from bulk import BulkError, bulk_cards, select_cards
+from cache import CacheCheckpoint
+from changes import ChangeLog
+from events import ACTION_EVENTS, EventBus, poll_actions
+from history_index import index_metadata, open_collection, rerank_by_recency
+from intents import extract_entities
+from jobs import JobQueue
+from llm_extraction import extract_with_llm, warm_up
+from dag import DependencyFailed, run_dag
+from models import Board, decode_many
+from ndjson import gzip_chunks, iter_json_array, iter_records
+from prompt_context import build_history, summarize_conversation
+from resilience import CircuitOpen, trello
+from templates import TemplateStore, template_board_id
+from webhooks import apply_action, register_webhooks, verify_signature
 import re
         
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = 1024
+
+# Prefer brotli when it is installed, it falls back to gzip for clients that don't accept br
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
 
 # Load environment variables
 load_dotenv()
@@ -24,13 +62,220 @@ TRELLO_API_KEY = os.getenv("TRELLO_API_KEY")
 TRELLO_TOKEN = os.getenv("TRELLO_TOKEN")
 LANGSMITH_API_KEY = os.getenv("LANGCHAIN_API_KEY")
 
+# Trello app secret signing webhook calls, and the public URL of /trello/webhook Trello calls back
+TRELLO_API_SECRET = os.getenv("TRELLO_API_SECRET")
+WEBHOOK_CALLBACK_URL = os.getenv("WEBHOOK_CALLBACK_URL")
+
+# spaCy pipeline used for entity extraction; see benchmarks/intents.py for the trade-offs
+SPACY_MODEL = "en_core_web_trf"
+
+# NER backend: "spacy" runs SPACY_MODEL, "onnx" runs the int8 model exported by scripts/export_onnx_ner.py
+NER_BACKEND = os.getenv("NER_BACKEND", "spacy")
+ONNX_NER_PATH = os.getenv("ONNX_NER_PATH", "./onnx_ner")
+ONNX_NER_THREADS = int(os.getenv("ONNX_NER_THREADS", "1"))
+
+# Local SQLite file holding the backend's own state (board build journal, jobs, ...)
+STATE_DB_PATH = "./local_state.sqlite3"
+
+# Worker threads per async job kind
+JOB_CONCURRENCY = {"board": 2, "prompt": 4, "bulk": 1, "import": 1}
+
+# Trello allows 100 requests per 10 seconds per token; stay a little under it
+TRELLO_REQUESTS_PER_SECOND = 9
+TRELLO_BURST = 10
+
+# Seconds between polls of Trello actions for change events, 0 disables polling
+EVENT_POLL_SECONDS = 30
+
+# Days of changes kept for /changes; older cursors must resync
+CHANGE_LOG_RETENTION_DAYS = 30
+
+# Seconds a cached Trello read is served; webhooks keep the cache fresh, so it can live much longer with them
+READ_CACHE_TTL = 600 if WEBHOOK_CALLBACK_URL else 5
+READ_CACHE_ENTRIES = 2000
+
+# Accounts other than the default one cache their reads briefly until they register webhooks, and hold fewer
+ACCOUNT_CACHE_TTL = 5
+ACCOUNT_CACHE_ENTRIES = 500
+
+# Seconds a snapshot of the member's boards answers /analytics and counting questions before it is retaken
+ANALYTICS_SNAPSHOT_SECONDS = 60
+
+# Seconds between snapshots of the read cache to STATE_DB_PATH, which is also saved on shutdown
+CACHE_CHECKPOINT_SECONDS = 60
+
+# Upstream headers passed through by streamed proxies, so clients see sizes, ranges and file names
+PASSTHROUGH_HEADERS = ("content-length", "content-range", "accept-ranges", "content-type", "content-disposition",
+                       "etag", "last-modified")
+
+# Folder where uploaded board archives wait to be imported
+IMPORT_SPOOL_DIR = "./imports"
+
+# Upstream bytes read per chunk when streaming NDJSON responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# HNSW index of the chat history; space, M and construction ef only apply to a newly created collection
+CHAT_HISTORY_INDEX = index_metadata(
+    space=os.getenv("CHAT_HISTORY_SPACE", "cosine"),
+    m=int(os.getenv("CHAT_HISTORY_HNSW_M", "16")),
+    construction_ef=int(os.getenv("CHAT_HISTORY_CONSTRUCTION_EF", "100")),
+    search_ef=int(os.getenv("CHAT_HISTORY_SEARCH_EF", "50")),
+)
+
+# Past conversations added to an answer prompt, picked from HISTORY_CANDIDATES nearest ones
+HISTORY_RESULTS = int(os.getenv("HISTORY_RESULTS", "5"))
+HISTORY_CANDIDATES = int(os.getenv("HISTORY_CANDIDATES", "20"))
+
+# Share of a past conversation's rank that comes from its age, 0 ranks by relevance alone
+HISTORY_RECENCY_WEIGHT = float(os.getenv("HISTORY_RECENCY_WEIGHT", "0"))
+HISTORY_HALF_LIFE_DAYS = float(os.getenv("HISTORY_HALF_LIFE_DAYS", "30"))
+
 # Initialize ChromaDB client
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
-collection = chroma_client.get_or_create_collection(name="chat_history")
+
+# Journal of board creation plans, so retried requests resume where they stopped
+board_journal = BoardJournal(STATE_DB_PATH)
+
+# Named board templates that new boards are copied from
+template_store = TemplateStore(STATE_DB_PATH)
+
+# Background jobs for async /prompt requests
+job_queue = JobQueue(STATE_DB_PATH, JOB_CONCURRENCY)
+
+# Stable system prompt for free-form answers; keeping it identical lets Ollama reuse the cached prefix
+ANSWER_SYSTEM_PROMPT = """You are a helpful assistant specialized in Trello task management.
+Based on the user's request related to Trello, provide a helpful response.
+If the request appears to be asking for an action that's not implemented yet,
+politely explain what capabilities are currently available."""
+
+# Small model for structured extraction, larger one for free-form answers
+EXTRACTION_MODEL = "llama3.2:1b"
+ANSWER_MODEL = "llama3.2"
+
+# How long Ollama keeps the models loaded after a request, so they are never cold-loaded on the request path
+OLLAMA_KEEP_ALIVE = "24h"
+
+# A new command starts at "and", "then" or ";" followed by a command run_command can combine: creating,
+# deleting, archiving or moving a board, list or card. "and add cards: A, B" continues the command before it
+COMMAND_SPLIT = re.compile(
+    r"\s*(?:;|,?\s*\bthen\b|,?\s+and\s+)\s*"
+    r"(?=(?:create|add|make|delete|remove|erase|archive|move)\b"
+    r"(?:\s+\S+){0,3}?\s+(?:boards?|lists?|cards?)\b(?!\s*:))",
+    re.IGNORECASE,
+)
+
+# Independent commands of one request run at the same time
+COMMAND_CONCURRENCY = 4
+
+# Concurrent slots and the longest queue wait in seconds, per kind of work, before answering 503
+ADMISSION_POOLS = {
+    "llm": (1, 20),  # One local model: generations queue behind each other
+    "nlp": (2, 2),
+    "trello": (16, 5),
+}
+
+# Estimated tokens of past conversations added to an answer prompt
+HISTORY_TOKEN_BUDGET = 400
+
+# Totals across LLM answers, reported by /metrics
+llm_stats = {"requests": 0, "prompt_tokens": 0, "prefill_ms": 0.0, "completion_tokens": 0, "total_ms": 0.0,
+             "extractions": 0, "extractions_parsed": 0}
+llm_stats_lock = threading.Lock()
+
+# Board/list/card changes, persisted for /changes and pushed to connected clients
+change_log = ChangeLog(STATE_DB_PATH)
+event_bus = EventBus(log=change_log)
 
 # Connect to the LangSmith client
 client = Client()
 
+# Bounded, prioritised concurrency for LLM generation, NLP parsing and Trello reads, shared by all accounts
+admission = {name: AdmissionPool(name, slots, deadline) for name, (slots, deadline) in ADMISSION_POOLS.items()}
+
+# Each Trello account has its own rate limit bucket pacing fan-out writes, single-flight group for
+# identical GETs, read cache tagged by what reads depend on, and chat history
+def chat_history(name):
+    """Open a chat history collection by name when it is first needed, see Account.history."""
+    return lambda create: open_collection(chroma_client, name, CHAT_HISTORY_INDEX, create)
+
+
+default_account = Account(TRELLO_API_KEY, TRELLO_TOKEN, chat_history("chat_history"),
+                          READ_CACHE_TTL, READ_CACHE_ENTRIES, TRELLO_REQUESTS_PER_SECOND, TRELLO_BURST, default=True)
+
+
+def new_account(key, token):
+    """Set up an account for a key/token first seen on a request, once Trello accepts the pair."""
+    response = trello.get("https://api.trello.com/1/members/me", params={"fields": "id", "key": key, "token": token})
+    if response.status_code in (400, 401, 403):
+        raise AccountError(f"Trello rejected the X-Trello-Token. {response.text}")
+    response.raise_for_status()
+    return Account(key, token, chat_history(f"chat_history_{account_id(key, token)}"),
+                   ACCOUNT_CACHE_TTL, ACCOUNT_CACHE_ENTRIES, TRELLO_REQUESTS_PER_SECOND, TRELLO_BURST)
+
+
+accounts = AccountRegistry(default_account, new_account)
+
+# Only the default account's cache is checkpointed, other accounts' tokens are never stored
+cache_checkpoint = CacheCheckpoint(STATE_DB_PATH)
+
+
+def current():
+    """The account the current request or job acts for."""
+    return current_account.get() or default_account
+
+
+@app.middleware("http")
+async def bind_account(request: Request, call_next):
+    """Act for the account in the X-Trello-Key and X-Trello-Token headers; without a token, the default one.
+
+    The key defaults to TRELLO_API_KEY, so clients of the same Trello app only send their token.
+    A token Trello rejects gets a 401 before anything is set up for it.
+    """
+    token = request.headers.get("X-Trello-Token")
+    if token:
+        key = request.headers.get("X-Trello-Key") or TRELLO_API_KEY
+        try:
+            account = await run_in_threadpool(accounts.get, key, token)
+        except AccountError as e:
+            return ORJSONResponse({"error": str(e)}, status_code=401)
+        except (CircuitOpen, requests.RequestException) as e:
+            return ORJSONResponse({"error": f"Failed to check the Trello token. {str(e)}"}, status_code=503)
+        # Each request runs in its own context, so this doesn't leak into other requests
+        current_account.set(account)
+    return await call_next(request)
+
+
+def trello_get(url, params, tags=()):
+    """GET from Trello, joining any identical request already in flight.
+
+    Reads with tags are cached until they expire or a change to one of the tags drops them. While
+    Trello is failing, an expired body still in the cache is served rather than an error.
+    """
+    account = current()
+    key = (url, tuple(sorted(params.items())))
+    if tags:
+        cached = account.cache.get(key)
+        if cached:
+            return cached
+
+    def fetch():
+        try:
+            with admission["trello"].slot():
+                response = trello.get(url, params=params)
+        except (CircuitOpen, Overloaded, requests.RequestException):
+            stale = account.cache.get(key, stale=True) if tags else None
+            if stale:
+                return stale
+            raise
+        response.content  # Read the body once so every waiter can share it
+        if tags and response.status_code == 200:
+            account.cache.put(key, response.content, tags)
+        elif tags and response.status_code >= 500:
+            return account.cache.get(key, stale=True) or response
+        return response
+
+    return account.reads.do(key, fetch)
+
 def convert_messages_to_ollama(messages):
     """Convert LangChain formatted messages to Ollama format."""
     converted_messages = []
@@ -43,151 +288,45 @@ def convert_messages_to_ollama(messages):
             })
     return converted_messages
 
-nlp = spacy.load("en_core_web_trf")
-matcher = Matcher(nlp.vocab)
-
-def detect_action(text):
-    """Detects if the user is trying to create, update, or delete an object."""
-    action_patterns = {
-        "create": [["create"], ["add"], ["make"], ["new"]],
-        "delete": [["delete"], ["remove"], ["erase"]],
-        "update": [["update"], ["change"], ["modify"]],
-        "list": [["list"], ["show"], ["view"]],
-    }
-
-    doc = nlp(text.lower())
-    for action, patterns in action_patterns.items():
-        for pattern in patterns:
-            if all(token.text in [t.text for t in doc] for token in nlp(" ".join(pattern))):
-                return action
-    return "unknown"
-
-def detect_object(text):
-    """Detects if the user is referring to a board, list, or card."""
-    object_patterns = {
-        "board": ["board"],  # Simplified to allow partial matching
-        "list": ["list"],
-        "card": ["card"],
-    }
-
-    # Lowercase the input text for case-insensitive matching
-    doc = nlp(text.lower())
-    text_tokens = [token.text for token in doc]  # Extract tokens from the input text
-
-    # Check for object patterns in the input text
-    for obj, patterns in object_patterns.items():
-        for pattern in patterns:
-            if pattern in text_tokens:
-                return obj
-    return "unknown"
-
-def extract_entities(text):
-    """Extracts key details (action type, object type, name, lists) from user input using spaCy."""
-    doc = nlp(text)  # Assuming 'nlp' is a spaCy model already loaded
-    extracted_info = {
-        "action_type": None,
-        "object_type": None,
-        "name": None,
-        "description": None,
-        "lists": [],
-        "cards": [],
-        "other_parameters": {}
-    }
+if NER_BACKEND == "onnx":
+    from onnx_ner import OnnxNer
+    ner = OnnxNer(ONNX_NER_PATH, threads=ONNX_NER_THREADS)
+    nlp = spacy.blank("en")  # Tokenizer only, entities come from the ONNX model
+else:
+    ner = None
+    nlp = spacy.load(SPACY_MODEL)
 
-    # Detect Named Entities (NER)
-    for ent in doc.ents:
-        if ent.label_ in ["ORG", "PRODUCT"]:  # Trello objects often classified under ORG/PRODUCT
-            extracted_info["name"] = ent.text
-        elif ent.label_ == "DATE":
-            extracted_info["other_parameters"]["due_date"] = ent.text
-        elif ent.label_ == "PERSON":
-            extracted_info["other_parameters"]["member"] = ent.text
-
-    # Rule-based intent detection for action and object
-    extracted_info["action_type"] = detect_action(text)
-    extracted_info["object_type"] = detect_object(text)
- 
-    # If no board name is extracted, attempt to infer it based on object_type
-    if not extracted_info["name"] and extracted_info["object_type"] == "board":
-        # Try to find pattern: "board [name]" or "board called [name]"
-        board_name_match = re.search(r"board\s+(?:called\s+)?(\w+)", text, re.IGNORECASE)
-        if board_name_match:
-            extracted_info["name"] = board_name_match.group(1)
-            
-    # Extract lists from user input (if present)
-    list_match = re.search(r"lists?(?:\s*:\s*|\s+with\s+)?(.*)", text, re.IGNORECASE)
-    if list_match:
-        list_text = list_match.group(1)
-        # Clean up potential numeric prefixes like "2 lists:"
-        list_text = re.sub(r"^\d+\s+lists?(?:\s*:\s*)?", "", list_text)
-        extracted_info["lists"] = [name.strip() for name in re.split(r",|\band\b", list_text) if name.strip()]
-        
-    # Extract cards from user input (if present)
-    card_match = re.search(r"cards?:\s*(.*)", text, re.IGNORECASE)  # Find cards section
-    if card_match:
-        card_text = card_match.group(1)
-        extracted_info["cards"] = [name.strip() for name in re.split(r",|\band\b", card_text) if name.strip()]
-
-    return extracted_info
-
-@app.post("/prompt")
-async def ask(request: Request):
-    """Process a user request and generate the proper action using LLM for information extraction"""
-    
-    body = await request.json()
-    action = body.get("action", "").strip()
-    
-    if not action:
-        return {"error": "No action provided in the request."}
+def split_commands(text):
+    """Split "create board Q3 with lists A, B and delete board Old" into one command per action."""
+    return [part.strip() for part in COMMAND_SPLIT.split(text) if part and part.strip()]
 
-    # Extract structured information using spaCy
-    extracted_info = extract_entities(action)
-
-    # If spaCy fails, use LLM for extraction
-    if not extracted_info["action_type"] or extracted_info["object_type"] == "unknown":
-        extraction_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an AI assistant specialized in extracting structured information from user requests related to Trello.
-            Extract the following details:
-            - Action type: create, list, update, delete, etc.
-            - Object type: board, list, card, etc.
-            - Name: The name provided for the object.
-            - Description: Any description provided.
-            - Other parameters: Due dates, labels, members, etc.
-            - Lists: A list of names for lists to create. If the user specifies them, extract exactly what they said.
-            - Example user input: 'Create a board for Work with lists: Urgent, Pending, Completed'
-            - Extracted lists should be: ["Urgent", "Pending", "Completed"]
-            - Cards: A list of names for cards to create. If the user specifies them, extract exactly what they said.
-            - Example user input: 'Create a board for Work with lists: Urgent and 3 cards: Red, Yellow and Green'
-            - Extracted cards should be: ["Red", "Yellow", "Green"]
-
-            Ensure lists are **ALWAYS extracted** if the user provides them.
-            Ensure cards are **ALWAYS extracted** if the user provides them.
-
-            """)
 
-        ])
-        
-        # Format prompt & convert to Ollama format
-        extraction_messages = extraction_prompt.format_messages(request=action)
-        ollama_extraction_messages = convert_messages_to_ollama(extraction_messages)
+def interpret(action):
+    """Extract structured information with spaCy, falling back to the LLM when the intent is unclear."""
+    with admission["nlp"].slot():
+        extracted_info = extract_entities(action, nlp, entities=ner(action) if ner else None)
 
+    # If spaCy fails, use LLM for extraction; questions counting cards are understood without it
+    unclear = not extracted_info["action_type"] or extracted_info["object_type"] == "unknown"
+    if unclear and not extracted_info["analytics"]:
         try:
-            extraction_response = ollama.chat(
-                model="llama3.2",
-                messages=ollama_extraction_messages
-            )
-            extracted_info.update(json.loads(extraction_response["message"]["content"]))
-        except:
-            pass  #If LLM fails, continue with spaCy-extracted data
+            # Extraction serves a command, so it queues ahead of free-form answers
+            with admission["llm"].slot():
+                llm_info = extract_with_llm(action, EXTRACTION_MODEL, OLLAMA_KEEP_ALIVE)
+        except Exception as e:
+            llm_info = None
+            print(f"LLM extraction failed: {str(e)}")
+        with llm_stats_lock:
+            llm_stats["extractions"] += 1
+            llm_stats["extractions_parsed"] += llm_info is not None
+        if llm_info:
+            # Keep spaCy's values where the model had nothing to add
+            extracted_info.update({k: v for k, v in llm_info.items() if v not in (None, [], {}, "unknown")})
+    return extracted_info
 
-    #Get past conversations for context
-    try:
-        results = collection.query(query_texts=[action], n_results=5)
-        past_conversations = results["documents"][0] if results["documents"] else ["No relevant past conversations found."]
-    except Exception as e:
-        past_conversations = [f"Error retrieving past conversations: {str(e)}"]
 
-    #Determine action type and object type
+def run_command(action, extracted_info, idempotency_key, rollback=False, store=True, progress=None):
+    """Run a structured Trello command; returns None when the request isn't one we can execute."""
     action_type = extracted_info.get("action_type")
     object_type = extracted_info.get("object_type")
     # Create a Trello Board
@@ -197,78 +336,26 @@ async def ask(request: Request):
         list_names = extracted_info.get("lists", [])
         card_names = extracted_info.get("cards", [])
         
-        url = "https://api.trello.com/1/boards/"
-        board_params = {
-            "name": board_name,
-            "desc": description,
-            "key": TRELLO_API_KEY,
-            "token": TRELLO_TOKEN,
-        }
-        
-        try:
-            # Create the Board
-            board_response = requests.post(url, params=board_params)
-            if board_response.status_code != 200:
-                return {"error": f"Failed to create Trello board. {board_response.text}"}
-
-            board_data = board_response.json()
-            board_id = board_data["id"]
-
-            # Initialize created_cards outside of the loop (before the loop starts)
-            created_cards = []  # Move this line here
-            created_lists = []
-            
-            # Create Lists in the Board (if specified)
-            for list_name in list_names:
-                list_url = "https://api.trello.com/1/lists"
-                list_params = {
-                    "name": list_name,
-                    "idBoard": board_id,
-                    "key": TRELLO_API_KEY,
-                    "token": TRELLO_TOKEN
-                }
-                list_response = requests.post(list_url, params=list_params)
-                if list_response.status_code != 200:
-                    return {"error": f"Failed to create list. {list_response.text}"}
-
-                created_list = list_response.json()
-                print(f"Created list: {created_list}")  # Debugging
-                created_lists.append(created_list)
-                
-                list_id = created_list["id"]
-
-                if card_names:  # Ensure there are cards to create
-                    for card_name in card_names:
-                        card_url = "https://api.trello.com/1/cards"
-                        card_params = {
-                            "name": card_name,
-                            "idList": list_id,
-                            "key": TRELLO_API_KEY,
-                            "token": TRELLO_TOKEN
-                        }
-                        card_response = requests.post(card_url, params=card_params)
-                        if card_response.status_code != 200:
-                            return {"error": f"Failed to create card. {card_response.text}"}
-                        created_card = card_response.json()
-                        print(f"Created card: {created_card}")  # Debugging
-                        created_cards.append(created_card)
-
-            # Return success message
-            answer = f"I've created a new Trello board called '{board_name}'"
-            if description:
-                answer += f" with description: '{description}'."
-            if created_lists:
-                list_names_str = ', '.join([lst['name'] for lst in created_lists])
-                answer += f" It includes the lists: {list_names_str}."
-            if created_cards:
-                card_names_str = ', '.join([crd['name'] for crd in created_cards])
-                answer += f" It includes the cards: {card_names_str}."
-            
-            store_conversation(action, answer)
-            return {"answer": answer, "board": board_data, "lists": created_lists, "cards": created_cards}
-
-        except Exception as e:
-            return {"error": f"Error creating Trello board and lists: {str(e)}"}
+        template_name = extracted_info.get("template")
+        if template_name:
+            template = template_store.get(template_name)
+            if not template:
+                return {"error": f"Template '{template_name}' not found."}
+            if not current().default and template["layout"]:
+                # Template boards belong to the default account, other accounts build the layout themselves
+                plan = plan_layout(board_name, template["layout"], description)
+            else:
+                try:
+                    account = current()
+                    source_board_id = template_board_id(template_store, board_journal, template, account.auth,
+                                                        account.limiter)
+                except Exception as e:
+                    return {"error": f"Error preparing template '{template_name}': {str(e)}"}
+                # One server-side copy replaces a request per list and card
+                plan = plan_board_copy(board_name, source_board_id, description)
+        else:
+            plan = plan_board(board_name, description, list_names, card_names)
+        return build_board(action, idempotency_key, plan, rollback, store=store)
     
    
     #Delete a Trello Board
@@ -276,45 +363,366 @@ async def ask(request: Request):
         board_name = extracted_info.get("name")
         if not board_name:
             return {"error": "No board name provided. Please specify the board you want to delete."}
+        return delete_board(action, board_name, extracted_info, store=store)
 
-        url_get_boards = "https://api.trello.com/1/members/me/boards"
-        params = {"key": TRELLO_API_KEY, "token": TRELLO_TOKEN}
+    #Archive, move, label or update many cards at once
+    elif (action_type in ("archive", "move") and re.search(r"\bcards?\b", action, re.IGNORECASE)
+          or action_type == "label" or action_type == "update" and extracted_info.get("fields")):
+        return bulk_command(action, extracted_info, store=store, progress=progress)
 
-        try:
-            boards_response = requests.get(url_get_boards, params=params)
-            if boards_response.status_code != 200:
-                return {"error": f"Failed to retrieve Trello boards. {boards_response.text}"}
-
-            boards = boards_response.json()
-            board_id = next((b["id"] for b in boards if b["name"].lower() == board_name.lower()), None)
-            if not board_id:
-                return {"error": f"Board '{board_name}' not found in your Trello account."}
-
-            # Delete the board
-            url_delete = f"https://api.trello.com/1/boards/{board_id}"
-            delete_response = requests.delete(url_delete, params=params)
-            if delete_response.status_code == 200:
-                answer = f"I've deleted the board called '{board_name}' from your account."
+    #Answer questions about card counts from the board snapshot
+    elif action_type == "list" and extracted_info.get("analytics"):
+        return analytics_command(action, extracted_info, store=store)
+
+    return None
+
+
+def find_list(list_name, board_name=None):
+    """Find an open list by name on the member's open boards, as (list id, board id).
+
+    Most boards have a "Done" list, so a name found on several boards needs the board named too.
+    """
+    url = "https://api.trello.com/1/members/me/boards"
+    params = {"fields": "name", "filter": "open", "lists": "open", "list_fields": "name", **current().auth}
+    response = trello_get(url, params, tags=("member",))
+    if response.status_code != 200:
+        raise BulkError(f"Failed to retrieve Trello lists. {response.text}")
+    matches = [(lst["id"], board["id"], board["name"]) for board in orjson.loads(response.content)
+               if not board_name or board["name"].lower() == board_name.lower()
+               for lst in board.get("lists", []) if lst["name"].lower() == list_name.lower()]
+    if not matches:
+        where = f"on board '{board_name}'" if board_name else "in your Trello account"
+        raise BulkError(f"List '{list_name}' not found {where}.")
+    if len(matches) > 1:
+        boards = ", ".join(f"'{name}'" for _, _, name in matches)
+        raise BulkError(f"More than one board has a list '{list_name}': {boards}. "
+                        f"Please say which one, e.g. 'on board {matches[0][2]}'.")
+    return matches[0][0], matches[0][1]
+
+
+def find_label(label_name, board_id):
+    """Find a label of a board by name."""
+    response = trello_get(f"https://api.trello.com/1/boards/{board_id}/labels",
+                          {"fields": "name", **current().auth}, tags=(f"board:{board_id}",))
+    if response.status_code != 200:
+        raise BulkError(f"Failed to retrieve Trello labels. {response.text}")
+    for label in orjson.loads(response.content):
+        if (label.get("name") or "").lower() == label_name.lower():
+            return label["id"]
+    raise BulkError(f"Label '{label_name}' not found on the list's board.")
+
+
+def bulk_command(action, extracted_info, store=True, progress=None):
+    """Archive, move, label or update the cards of a list, optionally only those with a label."""
+    operation = extracted_info["action_type"]
+    source_name = extracted_info.get("source_list")
+    target_name = extracted_info.get("target_list")
+    label = extracted_info.get("label")
+    if not source_name and not (operation == "move" and label):
+        return {"error": "No list provided. Please say which list's cards you mean, e.g. 'archive all cards in Done'."}
+    if operation == "move" and not target_name:
+        return {"error": "No target list provided. Please say where the cards should go, e.g. 'to Today'."}
+
+    try:
+        board_name = extracted_info.get("board")
+        target_list_id, target_board_id = find_list(target_name, board_name) if operation == "move" else (None, None)
+        if source_name:
+            list_id, board_id = find_list(source_name, board_name)
+            label_id = find_label(extracted_info["new_label"], board_id) if operation == "label" else None
+            result = run_bulk({"operation": operation, "list_id": list_id, "label": label,
+                               "target_list_id": target_list_id, "target_board_id": target_board_id,
+                               "fields": extracted_info.get("fields"), "label_id": label_id}, progress)
+        else:
+            # A label alone selects cards from every list on the target's board
+            result = move_labelled_cards(label, target_list_id, target_board_id, progress)
+    except BulkError as e:
+        return {"error": str(e)}
+    if "error" in result:
+        return result
+
+    cards = "the cards" + (f" labelled '{label}'" if label else "")
+    where = f" in '{source_name}'" if source_name else ""
+    if operation == "archive":
+        answer = f"I've archived {cards}{where}."
+    elif operation == "label":
+        answer = f"I've added the label '{extracted_info['new_label']}' to {cards}{where}."
+    elif operation == "update":
+        state = "complete" if extracted_info["fields"].get("dueComplete") == "true" else "not complete"
+        answer = f"I've marked {cards}{where} as {state}."
+    else:
+        answer = f"I've moved {cards}{where} to '{target_name}'."
+    if result.get("failed"):
+        answer += f" {len(result['failed'])} cards could not be changed."
+    if store:
+        store_conversation(action, answer)
+    return {"answer": answer, "bulk": result, "extracted_info": extracted_info}
+
+
+def move_labelled_cards(label, target_list_id, target_board_id, progress=None):
+    """Move every open card with a label on the target list's board into the target list."""
+    auth = current().auth
+    response = trello_get(f"https://api.trello.com/1/boards/{target_board_id}/lists",
+                          {"fields": "id", **auth}, tags=(f"board:{target_board_id}",))
+    if response.status_code != 200:
+        raise BulkError(f"Failed to fetch Trello lists. {response.text}")
+    card_ids = []
+    for lst in orjson.loads(response.content):
+        if lst["id"] != target_list_id:
+            card_ids += select_cards(lst["id"], auth, label)
+    if not card_ids:
+        return {"operation": "move", "method": "per-card", "requests": 0, "total": 0, "succeeded": 0, "failed": []}
+    return run_bulk({"operation": "move", "card_ids": card_ids, "target_list_id": target_list_id,
+                     "target_board_id": target_board_id}, progress)
+
+
+def run_bulk(payload, progress=None):
+    """Run a /cards/bulk payload, publishing each changed card to connected clients."""
+    account = current()
+    lists = [f"list:{payload[name]}" for name in ("list_id", "target_list_id") if payload.get(name)]
+    try:
+        return bulk_cards(
+            payload.get("operation"), account.auth, account.limiter,
+            list_id=payload.get("list_id"),
+            card_ids=payload.get("card_ids"),
+            label=payload.get("label"),
+            target_list_id=payload.get("target_list_id"),
+            target_board_id=payload.get("target_board_id"),
+            fields=payload.get("fields"),
+            label_id=payload.get("label_id"),
+            progress=progress,
+            on_change=lambda change: on_card_change(change, account),
+        )
+    except BulkError as e:
+        return {"error": str(e)}
+    finally:
+        # Cards leave or join these lists whatever the outcome, and reads during the operation may have cached them
+        account.cache.invalidate(*lists)
+
+
+def analytics_snapshot(refresh=False):
+    """The current account's board snapshot, retaken when older than ANALYTICS_SNAPSHOT_SECONDS."""
+    account = current()
+    snapshot = account.snapshot
+    if snapshot and not refresh and snapshot.age < ANALYTICS_SNAPSHOT_SECONDS:
+        return snapshot
+
+    def take():
+        account.snapshot = load_snapshot(lambda url, params: trello_get(url, {**params, **account.auth}), account.limiter)
+        return account.snapshot
+
+    # Requests arriving while it is retaken share the new snapshot
+    return account.reads.do(("analytics snapshot",), take)
+
+
+def analytics_command(action, extracted_info, store=True):
+    """Answer a question like "how many overdue cards per list?" from the board snapshot, without the LLM."""
+    question = extracted_info["analytics"]
+    try:
+        report = aggregate(analytics_snapshot())
+    except (AnalyticsError, CircuitOpen, requests.RequestException) as e:
+        return {"error": f"Failed to count your cards. {str(e)}"}
+    answer = describe(report, question["metric"], question["group"], question["ascending"])
+    if store:
+        store_conversation(action, answer)
+    totals = {name: report[name] for name in ("cards", "overdue", "due_soon", "unassigned")}
+    return {"answer": answer, "analytics": totals, "extracted_info": extracted_info}
+
+
+def on_card_change(change, account):
+    """Publish a card changed by a bulk operation and drop the account's cached reads of it."""
+    account.cache.invalidate(f"card:{change['id']}")
+    if change.get("idList"):
+        account.cache.invalidate(f"list:{change['idList']}")
+    event_bus.publish("card", "updated", change, account=account.partition)
+
+
+def delete_board(action, board_name, extracted_info, store=True):
+    """Delete the member's board with the given name."""
+    url_get_boards = "https://api.trello.com/1/members/me/boards"
+    account = current()
+    params = account.auth
+
+    try:
+        boards_response = trello_get(url_get_boards, params, tags=("member",))
+        if boards_response.status_code != 200:
+            return {"error": f"Failed to retrieve Trello boards. {boards_response.text}"}
+
+        boards = decode_many(Board, boards_response.content)
+        board_id = next((b.id for b in boards if b.name.lower() == board_name.lower()), None)
+        if not board_id:
+            return {"error": f"Board '{board_name}' not found in your Trello account."}
+
+        # Delete the board
+        url_delete = f"https://api.trello.com/1/boards/{board_id}"
+        delete_response = trello.delete(url_delete, params=params)
+        if delete_response.status_code == 200:
+            account.cache.invalidate("member", f"board:{board_id}")
+            event_bus.publish("board", "deleted", {"id": board_id, "name": board_name}, account=account.partition)
+            answer = f"I've deleted the board called '{board_name}' from your account."
+            if store:
                 store_conversation(action, answer)
-                return {"answer": answer, "deleted_board_name": board_name, "extracted_info": extracted_info}
-            else:
-                return {"error": f"Failed to delete Trello board. {delete_response.text}"}
-        except Exception as e:
-            return {"error": f"Error deleting Trello board: {str(e)}"}
+            return {"answer": answer, "deleted_board_name": board_name, "extracted_info": extracted_info}
+        else:
+            return {"error": f"Failed to delete Trello board. {delete_response.text}"}
+    except Exception as e:
+        return {"error": f"Error deleting Trello board: {str(e)}"}
 
-    #Handle Unsupported Actions Gracefully
+
+def run_commands(action, commands, idempotency_key, rollback=False):
+    """Run several commands as a DAG: commands on the same board run in sentence order, others concurrently."""
+    tasks = {}
+    last_for_board = {}
+    for index, command in enumerate(commands):
+        extracted_info = interpret(command)
+        board_name = (extracted_info.get("name") or "").lower()
+        deps = [last_for_board[board_name]] if board_name in last_for_board else []
+        if board_name:
+            last_for_board[board_name] = index
+
+        def task(_, command=command, extracted_info=extracted_info, index=index):
+            result = run_command(command, extracted_info, f"{idempotency_key}:{index}", rollback, store=False)
+            if result is None:
+                raise Exception("Only creating and deleting boards, archiving and moving cards and questions about "
+                                "card counts can be combined with other commands.")
+            if "error" in result:
+                raise Exception(result["error"])
+            return result
+
+        tasks[index] = (deps, task)
+
+    results, errors = run_dag(tasks, max_workers=COMMAND_CONCURRENCY)
+
+    steps = []
+    for index, command in enumerate(commands):
+        if index in results:
+            steps.append({"command": command, "status": "done", **results[index]})
+        else:
+            status = "skipped" if isinstance(errors[index], DependencyFailed) else "failed"
+            steps.append({"command": command, "status": status, "error": str(errors[index])})
+
+    answer = " ".join(step.get("answer") or f"I couldn't '{step['command']}': {step['error']}" for step in steps)
+    store_conversation(action, answer)
+    return {"answer": answer, "steps": steps, "idempotency_key": idempotency_key}
+
+
+@app.post("/prompt")
+async def ask(request: Request):
+    """Process a user request and generate the proper action using LLM for information extraction"""
+    
+    body = await request.json()
+    action = body.get("action", "").strip()
+    
+    if not action:
+        return {"error": "No action provided in the request."}
+
+    # Retries reuse the key so board creation resumes instead of starting over
+    idempotency_key = request.headers.get("Idempotency-Key") or body.get("idempotency_key") or str(uuid.uuid4())
+    rollback = bool(body.get("rollback", False))
+
+    # Opt-in async mode: answer 202 at once and run the work on the job queue
+    if body.get("async"):
+        payload = {"action": action, "idempotency_key": idempotency_key, "rollback": rollback}
+        job_id = submit_job(prompt_job_kind(action), payload, run_prompt_job)
+        return ORJSONResponse({"job_id": job_id, "status": "queued"}, status_code=202,
+                              headers={"Location": f"/jobs/{job_id}"})
+
+    # Off the event loop, so a slow prompt doesn't hold up other requests
+    return await run_in_threadpool(process_prompt, action, idempotency_key, rollback)
+
+
+def submit_job(kind, payload, handler):
+    """Queue a job that runs for the current account; its payload names the account, never its token."""
+    account = current()
+
+    def run(payload, progress=None):
+        token = current_account.set(account)
+        try:
+            return handler(payload, progress)
+        finally:
+            current_account.reset(token)
+
+    return job_queue.submit(kind, {**payload, "account": account.partition}, run)
+
+
+def recovered(handler):
+    """Handler for jobs left by a restart: another account's token is gone, so only the default account's rerun."""
+    def run(payload, progress=None):
+        if payload.get("account"):
+            return {"error": "The job was interrupted by a restart; submit it again."}
+        return handler(payload, progress)
+    return run
+
+
+def journal_key(idempotency_key):
+    """Board plans are journaled per account, so one account's key never resumes another's plan."""
+    account = current()
+    return idempotency_key if account.default else f"{account.id}:{idempotency_key}"
+
+
+def prompt_job_kind(action):
+    """Pick the job pool for a prompt: board creations write many objects, the rest mostly wait on the LLM."""
+    if re.search(r"\b(create|add|make|new)\b.*\bboards?\b", action, re.IGNORECASE):
+        return "board"
+    return "prompt"
+
+
+def run_prompt_job(payload, progress=None):
+    # Jobs yield to interactive requests and wait for a slot however long it takes
+    token = current_priority.set(PRIORITY_BACKGROUND)
     try:
-        response_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful assistant specialized in Trello task management."),
-            ("user", f"""
-            Request: {action}
+        return process_prompt(payload["action"], payload["idempotency_key"], payload["rollback"], progress)
+    finally:
+        current_priority.reset(token)
+
+
+def process_prompt(action, idempotency_key, rollback=False, progress=None):
+    """Extract the intent of a request, run the matching Trello action or answer it with the LLM."""
+    plan, status = board_journal.load_plan(journal_key(idempotency_key))
+    if plan:
+        # A finished plan was already stored and published by the request that ran it
+        finished = status == "done"
+        return build_board(action, idempotency_key, plan, rollback, store=not finished, publish=not finished)
+
+    # Sentences with several commands run as one dependency graph
+    commands = split_commands(action)
+    if len(commands) > 1:
+        return run_commands(action, commands, idempotency_key, rollback)
 
-            Past conversations for context: {past_conversations}
+    extracted_info = interpret(action)
+    result = run_command(action, extracted_info, idempotency_key, rollback, progress=progress)
+    if result is not None:
+        return result
 
-            Based on this request related to Trello, provide a helpful response.
-            If the request appears to be asking for an action that's not implemented yet, 
-            politely explain what capabilities are currently available.
-            """)
+    #Get past conversations for context, within the prompt token budget
+    collection = current().history(create=False)
+    try:
+        if collection is None:
+            # Nothing stored for this account yet
+            documents, metadatas = [], []
+        elif HISTORY_RECENCY_WEIGHT:
+            # Rank a wider set of neighbours by relevance and age, then keep the best
+            results = collection.query(query_texts=[action], n_results=max(HISTORY_CANDIDATES, HISTORY_RESULTS),
+                                       include=["documents", "metadatas", "distances"])
+            documents, metadatas = rerank_by_recency(
+                results["documents"][0] if results["documents"] else [],
+                results["metadatas"][0] if results["metadatas"] else [],
+                results["distances"][0] if results["distances"] else [],
+                HISTORY_RECENCY_WEIGHT, HISTORY_HALF_LIFE_DAYS)
+            documents, metadatas = documents[:HISTORY_RESULTS], metadatas[:HISTORY_RESULTS]
+        else:
+            results = collection.query(query_texts=[action], n_results=HISTORY_RESULTS, include=["documents", "metadatas"])
+            documents = results["documents"][0] if results["documents"] else []
+            metadatas = results["metadatas"][0] if results["metadatas"] else []
+        past_conversations, _ = build_history(documents, metadatas, HISTORY_TOKEN_BUDGET)
+    except Exception as e:
+        past_conversations = f"Error retrieving past conversations: {str(e)}"
+
+    #Handle Unsupported Actions Gracefully
+    try:
+        # The system message never changes, so Ollama can reuse its KV cache across requests
+        response_prompt = ChatPromptTemplate.from_messages([
+            ("system", ANSWER_SYSTEM_PROMPT),
+            ("user", "Past conversations for context:\n{past_conversations}\n\nRequest: {request}")
         ])
 
         response_messages = response_prompt.format_messages(
@@ -323,28 +731,86 @@ async def ask(request: Request):
         )
         ollama_response_messages = convert_messages_to_ollama(response_messages)
 
-        response = ollama.chat(
-            model="llama3.2",
-            messages=ollama_response_messages
-        )
+        with admission["llm"].slot(PRIORITY_ANSWER):
+            response = ollama.chat(
+                model=ANSWER_MODEL,
+                messages=ollama_response_messages,
+                keep_alive=OLLAMA_KEEP_ALIVE
+            )
         answer = response["message"]["content"]
         store_conversation(action, answer)
 
-        return {"answer": answer, "extracted_info": extracted_info}
+        return {"answer": answer, "extracted_info": extracted_info, "usage": record_llm_usage(response)}
 
+    except Overloaded:
+        raise
     except Exception as e:
         return {"error": f"Error handling unsupported action: {str(e)}", "extracted_info": extracted_info}
 
 
-# Helper function to store conversations in ChromaDB
+def record_llm_usage(response):
+    """Pull prompt size and prefill time out of an Ollama response and add them to the metrics."""
+    usage = {
+        "prompt_tokens": response.get("prompt_eval_count", 0),
+        "prefill_ms": response.get("prompt_eval_duration", 0) / 1e6,
+        "completion_tokens": response.get("eval_count", 0),
+        "total_ms": response.get("total_duration", 0) / 1e6,
+    }
+    with llm_stats_lock:
+        llm_stats["requests"] += 1
+        for name, value in usage.items():
+            llm_stats[name] += value
+    return usage
+
+
+def build_board(action, idempotency_key, plan, rollback=False, store=True, publish=True):
+    """Execute a board plan, resuming from the journal, and describe what was created.
+
+    `store` keeps the conversation, `publish` sends the created objects to clients and the change log.
+    """
+    account = current()
+    try:
+        board_data, created_lists, created_cards = execute_plan(board_journal, journal_key(idempotency_key), plan,
+                                                                account.auth, account.limiter, rollback)
+    except BoardBuildError as e:
+        return {"error": str(e), "idempotency_key": idempotency_key}
+    except Exception as e:
+        return {"error": f"Error creating Trello board and lists: {str(e)}", "idempotency_key": idempotency_key}
+    account.cache.invalidate("member")
+
+    # Return success message
+    description = plan[0].get("desc")
+    answer = f"I've created a new Trello board called '{board_data.name}'"
+    if description:
+        answer += f" with description: '{description}'."
+    if created_lists:
+        list_names_str = ', '.join([lst.name for lst in created_lists])
+        answer += f" It includes the lists: {list_names_str}."
+    if created_cards:
+        card_names_str = ', '.join([crd.name for crd in created_cards])
+        answer += f" It includes the cards: {card_names_str}."
+
+    if publish:
+        event_bus.publish("board", "created", asdict(board_data), account=account.partition)
+        for obj_type, objs in (("list", created_lists), ("card", created_cards)):
+            for obj in objs:
+                event_bus.publish(obj_type, "created", asdict(obj), account=account.partition)
+    if store:
+        store_conversation(action, answer)
+    return {"answer": answer, "board": board_data, "lists": created_lists, "cards": created_cards,
+            "idempotency_key": idempotency_key}
+
+
+# Helper function to store conversations in ChromaDB, in the current account's history
 def store_conversation(request, answer):
     try:
-        collection.add(
+        current().history().add(
             ids=[str(uuid.uuid4())],
             documents=[f"Q: {request}\nA: {answer}"],
             metadatas=[{
                 "request": request,
                 "answer": answer,
+                "summary": summarize_conversation(request, answer),
                 "timestamp": datetime.datetime.now().isoformat()
             }]
         )
@@ -352,70 +818,655 @@ def store_conversation(request, answer):
         print(f"Failed to store conversation: {str(e)}")
 
 
-@app.get("/getBoards")
-def get_boards():
-    """Fetch all boards associated with the authenticated Trello user."""
+def paginate(items, before=None, limit=None):
+    """Apply `before` cursor pagination; Trello ids grow with creation time, so pages run newest first.
 
-    url = f"https://api.trello.com/1/members/me/boards"
-    params = {
-        "key": TRELLO_API_KEY,
-        "token": TRELLO_TOKEN
-    }
+    Within a page items keep Trello's order, i.e. board position for lists and cards.
+    """
+    if before:
+        items = (item for item in items if item["id"] < before)
+    if limit:
+        # Keeps at most `limit` items in memory, even when `items` is a stream
+        page = heapq.nlargest(limit, enumerate(items), key=lambda pair: pair[1]["id"])
+        return [item for _, item in sorted(page, key=lambda pair: pair[0])]
+    return items
 
-    response = requests.get(url, params=params)
 
-    if response.status_code == 200:
-        return {"boards": response.json()}
-    else:
-        return {"error": "Failed to fetch Trello boards", "status_code": response.status_code}
+def wrap_raw(key, raw, **extra):
+    """Embed raw upstream JSON bytes under `key` without decoding and re-encoding them."""
+    body = b'{"' + key.encode() + b'":' + raw
+    for name, value in extra.items():
+        body += b',"' + name.encode() + b'":' + orjson.dumps(value)
+    return Response(content=body + b"}", media_type="application/json")
+
+
+def fetch_collection(url, key, tag, fields=None, before=None, limit=None, stream=False):
+    """Fetch a Trello collection with field projection, pagination and optional NDJSON streaming.
+
+    `tag` names what the collection depends on for the read cache. Trello doesn't page boards,
+    lists or cards, so the whole collection is always read from upstream; a page is cut from it
+    while decoding, holding at most `limit` items, and the cursor is the smallest id on the page.
+    """
+    params = dict(current().auth)
+    if fields:
+        params["fields"] = fields
+
+    # Streamed bodies can only be read once, so they are not shared
+    try:
+        response = trello.get(url, params=params, stream=True) if stream else trello_get(url, params, tags=(tag,))
+    except (CircuitOpen, requests.RequestException) as e:
+        return {"error": f"Failed to fetch Trello {key}. {str(e)}", "status_code": 503}
+    if response.status_code != 200:
+        response.close()
+        return {"error": f"Failed to fetch Trello {key}", "status_code": response.status_code}
+
+    if stream:
+        def ndjson():
+            try:
+                items = iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+                for item in paginate(items, before, limit):
+                    yield orjson.dumps(item) + b"\n"
+            finally:
+                response.close()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    if not before and not limit:
+        # Nothing to transform, pass Trello's bytes straight through
+        return wrap_raw(key, response.content, next_before=None)
+
+    # Decoded a chunk at a time, so only the page's items are ever held as objects
+    content = response.content
+    chunks = (content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(content), STREAM_CHUNK_SIZE))
+    page = list(paginate(iter_json_array(chunks), before, limit))
+    next_before = min(item["id"] for item in page) if limit and len(page) == limit else None
+    return {key: page, "next_before": next_before}
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    """Shed work that would wait past its deadline, telling the client when to come back."""
+    return ORJSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.get("/analytics")
+def get_analytics(board_id: str = None, refresh: bool = False):
+    """Card counts of the member's open boards: per board and list with overdue and due-soon cards,
+    per label, and open and overdue cards per member.
+
+    Counted from a snapshot taken at most ANALYTICS_SNAPSHOT_SECONDS ago; refresh=true retakes it.
+    """
+
+    try:
+        snapshot = analytics_snapshot(refresh)
+        start = time.perf_counter()
+        report = aggregate(snapshot, board_id)
+    except (AnalyticsError, CircuitOpen, requests.RequestException) as e:
+        return {"error": str(e)}
+    report["snapshot"] = {"cards": len(snapshot), "age_seconds": round(snapshot.age, 1),
+                          "aggregate_ms": round((time.perf_counter() - start) * 1000, 2)}
+    return report
+
+
+@app.get("/getBoards")
+def get_boards(fields: str = None, before: str = None, limit: int = None, stream: bool = False):
+    """Fetch all boards associated with the authenticated Trello user.
+
+    With limit, a page holds the newest items before `before`, in Trello's order.
+    """
+
+    url = f"https://api.trello.com/1/members/me/boards"
+    return fetch_collection(url, "boards", "member", fields, before, limit, stream)
     
 
 @app.get("/getLists")
-def get_lists(board_id: str):
-    """Fetch all lists for a given Trello board."""
-
-    url = f"https://api.trello.com/1/boards/{board_id}/lists"
-    params = {
-        "key": TRELLO_API_KEY,
-        "token": TRELLO_TOKEN
-    }
+def get_lists(board_id: str, fields: str = None, before: str = None, limit: int = None, stream: bool = False):
+    """Fetch all lists for a given Trello board.
 
-    response = requests.get(url, params=params)
+    With limit, a page holds the newest items before `before`, in Trello's order.
+    """
 
-    if response.status_code == 200:
-        return {"lists": response.json()}
-    else:
-        return {"error": "Failed to fetch Trello lists", "status_code": response.status_code}
+    url = f"https://api.trello.com/1/boards/{board_id}/lists"
+    return fetch_collection(url, "lists", f"board:{board_id}", fields, before, limit, stream)
     
 @app.get("/getCards")
-def get_cards(list_id: str):
-    """Fetch all cards for a given Trello list."""
+def get_cards(list_id: str, fields: str = None, before: str = None, limit: int = None, stream: bool = False):
+    """Fetch all cards for a given Trello list.
+
+    With limit, a page holds the newest items before `before`, in Trello's order.
+    """
 
     url = f"https://api.trello.com/1/lists/{list_id}/cards"
-    params = {
-        "key": TRELLO_API_KEY,
-        "token": TRELLO_TOKEN   
-    }
-    
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return {"cards": response.json()}
-    else:   
-        return {"error": "Failed to fetch Trello cards", "status_code": response.status_code}
+    return fetch_collection(url, "cards", f"list:{list_id}", fields, before, limit, stream)
     
+def stream_upstream(response, prefix=b"", suffix=b""):
+    """Pipe a streamed upstream response to the client chunk by chunk, with its status and size headers."""
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    if "content-length" in headers and (prefix or suffix):
+        headers["content-length"] = str(int(headers["content-length"]) + len(prefix) + len(suffix))
+    # Keeps the compression middleware off, so lengths and byte ranges stay exact
+    headers["content-encoding"] = "identity"
+
+    def body():
+        try:
+            if prefix:
+                yield prefix
+            yield from response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            if suffix:
+                yield suffix
+        finally:
+            response.close()
+
+    return StreamingResponse(body(), status_code=response.status_code, headers=headers)
+
+
+def content_disposition(filename):
+    """An attachment Content-Disposition for any file name, with an RFC 5987 UTF-8 name beside a plain ASCII one.
+
+    Quotes, backslashes, control and non-ASCII characters can't go in the quoted name, so they become "_" there.
+    """
+    fallback = "".join(char if " " <= char <= "~" and char not in '"\\' else "_" for char in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def download_attachment(card_id, attachment_id, byte_range=None):
+    """Proxy a card attachment's file from Trello, honouring a Range header."""
+    url = f"https://api.trello.com/1/cards/{card_id}/attachments/{attachment_id}"
+    account = current()
+    params = {"fields": "name,url,isUpload", **account.auth}
+    try:
+        response = trello_get(url, params, tags=(f"card:{card_id}",))
+    except (CircuitOpen, requests.RequestException) as e:
+        return {"error": f"Failed to fetch Trello attachment. {str(e)}", "status_code": 503}
+    if response.status_code != 200:
+        return {"error": "Failed to fetch Trello attachment", "status_code": response.status_code}
+    attachment = orjson.loads(response.content)
+    if not attachment.get("isUpload"):
+        # A link attachment points somewhere else, send the client there
+        return RedirectResponse(attachment["url"])
+
+    # Uploaded files are only served with OAuth header auth; identity keeps the bytes as stored
+    headers = {"Authorization": f'OAuth oauth_consumer_key="{account.key}", oauth_token="{account.token}"',
+               "Accept-Encoding": "identity"}
+    if byte_range:
+        headers["Range"] = byte_range
+    try:
+        response = trello.get(attachment["url"], headers=headers, stream=True)
+    except (CircuitOpen, requests.RequestException) as e:
+        return {"error": f"Failed to download Trello attachment. {str(e)}", "status_code": 503}
+    if response.status_code not in (200, 206, 416):
+        response.close()
+        return {"error": "Failed to download Trello attachment", "status_code": response.status_code}
+
+    streamed = stream_upstream(response)
+    if "content-disposition" not in streamed.headers:
+        streamed.headers["content-disposition"] = content_disposition(attachment["name"])
+    return streamed
+
+
 @app.get("/getFields")
-def get_fields(id: str, field:str):
-    """Fetch all fields for a given Trello list."""
+def get_fields(request: Request, id: str, field:str, stream: bool = False, attachment_id: str = None):
+    """Fetch all fields for a given Trello list.
+
+    With attachment_id (and field=attachments) the attachment's file is streamed instead, with
+    Range support; stream=true pipes a large field through without buffering it.
+    """
+
+    if attachment_id:
+        return download_attachment(id, attachment_id, request.headers.get("Range"))
 
     url = f"https://api.trello.com/1/cards/{id}/{field}"
 
-    params = {
-        "key": TRELLO_API_KEY,
-        "token": TRELLO_TOKEN
-    }
-    
-    response = requests.get(url, params=params)
+    params = dict(current().auth)
+
+    if stream:
+        try:
+            response = trello.get(url, params=params, headers={"Accept-Encoding": "identity"}, stream=True)
+        except (CircuitOpen, requests.RequestException) as e:
+            return {"error": f"Failed to fetch Trello fields. {str(e)}", "status_code": 503}
+        if response.status_code != 200:
+            response.close()
+            return {"error": "Failed to fetch Trello fields", "status_code": response.status_code}
+        # Same body as the buffered path, Trello's bytes wrapped as they pass
+        return stream_upstream(response, prefix=b'{"fields":', suffix=b'}')
+
+    try:
+        response = trello_get(url, params, tags=(f"card:{id}",))
+    except (CircuitOpen, requests.RequestException) as e:
+        return {"error": f"Failed to fetch Trello fields. {str(e)}", "status_code": 503}
     if response.status_code == 200:
-        return {"fields": response.json()}
+        return wrap_raw("fields", response.content)
     else:   
-        return {"error": "Failed to fetch Trello fields", "status_code": response.status_code}
\ No newline at end of file
+        return {"error": "Failed to fetch Trello fields", "status_code": response.status_code}
+
+
+@app.post("/cards/bulk")
+async def bulk_update_cards(request: Request):
+    """Archive, move, update or label many cards at once.
+
+    Body: operation, then either list_id (optionally with label) or card_ids, plus target_list_id
+    for moves, fields for updates and label_id for labels. With "async": true the operation runs
+    as a job whose progress shows on /jobs/{id}.
+    """
+
+    payload = await request.json()
+    if payload.get("async"):
+        job_id = submit_job("bulk", payload, run_bulk)
+        return ORJSONResponse({"job_id": job_id, "status": "queued"}, status_code=202,
+                              headers={"Location": f"/jobs/{job_id}"})
+    return await run_in_threadpool(run_bulk, payload)
+
+
+@app.get("/boards/{board_id}/export")
+def export_board_archive(board_id: str, compress: str = None):
+    """Stream a board with its labels, lists, cards and checklists as an NDJSON archive.
+
+    With compress=gzip the archive itself is gzipped, ready to be saved as a .ndjson.gz file.
+    """
+
+    try:
+        lines = export_board(board_id, current().auth)
+    except (ArchiveError, CircuitOpen, requests.RequestException) as e:
+        return {"error": str(e)}
+
+    filename = f"board-{board_id}.ndjson"
+    if compress == "gzip":
+        # Content-Encoding keeps the compression middleware from gzipping it a second time
+        return StreamingResponse(gzip_chunks(lines), media_type="application/gzip",
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}.gz"',
+                                          "Content-Encoding": "identity"})
+    return StreamingResponse(lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@app.post("/boards/import")
+async def import_board_archive(request: Request, name: str = None):
+    """Recreate a board from an archive made by /boards/{id}/export, plain or gzipped, sent as the body.
+
+    `name` renames the new board. With ?async=true the import runs as a job whose progress shows
+    on /jobs/{id}.
+    """
+
+    # The body is spooled to disk, so neither mode holds the archive in memory
+    os.makedirs(IMPORT_SPOOL_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=IMPORT_SPOOL_DIR, suffix=".ndjson", delete=False) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+
+    payload = {"path": spool.name, "name": name}
+    if request.query_params.get("async") == "true":
+        job_id = submit_job("import", payload, run_import)
+        return ORJSONResponse({"job_id": job_id, "status": "queued"}, status_code=202,
+                              headers={"Location": f"/jobs/{job_id}"})
+    return await run_in_threadpool(run_import, payload)
+
+
+def run_import(payload, progress=None):
+    """Import a spooled board archive, creating everything through the Trello rate limiter."""
+    account = current()
+    try:
+        with open(payload["path"], "rb") as f:
+            chunks = iter(lambda: f.read(STREAM_CHUNK_SIZE), b"")
+            result = import_board(iter_records(chunks), account.auth, account.limiter, payload.get("name"), progress)
+    except (ArchiveError, CircuitOpen, requests.RequestException, ValueError) as e:
+        return {"error": f"Failed to import board archive. {str(e)}"}
+    finally:
+        os.remove(payload["path"])
+
+    account.cache.invalidate("member")
+    event_bus.publish("board", "created", result["board"], account=account.partition)
+    return result
+
+
+def abandon_import(payload, progress=None):
+    """Imports aren't safe to repeat, so one cut short by a restart is reported instead of rerun."""
+    if os.path.exists(payload["path"]):
+        os.remove(payload["path"])
+    return {"error": "The import was interrupted by a restart; the partly imported board was kept."}
+
+
+@app.post("/templates")
+async def save_template(request: Request):
+    """Save a named board template, pointing at an existing board or describing lists and cards."""
+
+    body = await request.json()
+    name = body.get("name", "").strip()
+    board_id = body.get("board_id")
+    lists = body.get("lists", {})
+    if not name:
+        return {"error": "No template name provided."}
+    if not board_id and not lists:
+        return {"error": "A template needs a board_id or lists."}
+
+    # lists maps each list name to the card names it starts with
+    layout = [(list_name, cards or []) for list_name, cards in lists.items()]
+    template_store.save(name, board_id, layout)
+    return {"template": template_store.get(name)}
+
+
+@app.get("/templates")
+def get_templates():
+    """List the saved board templates."""
+
+    return {"templates": template_store.all()}
+
+
+@app.on_event("startup")
+def resume_jobs():
+    """Requeue async jobs interrupted by a restart; board plans resume through their idempotency key."""
+    job_queue.recover({"board": recovered(run_prompt_job), "prompt": recovered(run_prompt_job),
+                       "bulk": recovered(run_bulk), "import": abandon_import})
+
+
+@app.on_event("startup")
+def restore_read_cache():
+    """Reload the read cache saved by the last run; its bodies are checked against Trello in the background."""
+    auth, cache = default_account.auth, default_account.cache
+    cursor = cache_checkpoint.cursor(auth)
+    if not cursor:
+        return
+    keys = cache_checkpoint.restore(cache, auth)
+    # Startup doesn't wait on Trello; until checked, restored bodies only stand in while Trello is failing
+    threading.Thread(target=check_restored_cache, args=(cache, cursor, keys), daemon=True,
+                     name="read-cache-check").start()
+
+
+def check_restored_cache(cache, cursor, keys):
+    """Replay the Trello actions on each cached board since the cursor, then serve what's left as fresh."""
+    try:
+        boards = cached_boards(cache)
+        for board_id, list_ids in boards.items():
+            actions = fetch_board_actions(board_id, cursor)
+            if len(actions) >= 1000:
+                # More changed than one page of actions shows, so some of the board's reads may be stale
+                cache.invalidate(f"board:{board_id}", *(f"list:{list_id}" for list_id in list_ids))
+                continue
+            for action in reversed(actions):
+                apply_action(cache, action)
+    except Exception as e:
+        print(f"Dropping the restored read cache, could not check it against Trello: {str(e)}")
+        cache.drop(keys)
+        return
+    cache.refresh(keys)
+
+
+def cached_boards(cache):
+    """The member's boards the cache holds reads of, as board id -> list ids; drops reads of anything else.
+
+    Reads tagged only with a card or the member can't be traced to one board's actions, so they're fetched again.
+    """
+    params = {"fields": "id", "lists": "all", "list_fields": "id", **current().auth}
+    response = trello_get("https://api.trello.com/1/members/me/boards", params)
+    if response.status_code != 200:
+        raise Exception(f"Failed to retrieve Trello boards. {response.text}")
+    tags = cache.tags()
+    boards = {}
+    for board in orjson.loads(response.content):
+        list_ids = [lst["id"] for lst in board.get("lists", [])]
+        if f"board:{board['id']}" in tags or any(f"list:{list_id}" in tags for list_id in list_ids):
+            boards[board["id"]] = list_ids
+    checked = {f"board:{board_id}" for board_id in boards} | {f"list:{list_id}" for ids in boards.values() for list_id in ids}
+    cache.invalidate(*(tags - checked))
+    return boards
+
+
+def fetch_board_actions(board_id, since):
+    """Fetch every action on a board after `since`, an action id or date, newest first.
+
+    Unlike the member's own actions, these include changes collaborators made on shared boards.
+    """
+    account = current()
+    account.limiter.acquire()
+    response = trello_get(f"https://api.trello.com/1/boards/{board_id}/actions",
+                          {"since": since, "limit": 1000, **account.auth})
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch the actions of board {board_id}. {response.text}")
+    return orjson.loads(response.content)
+
+
+def save_read_cache():
+    """Snapshot the read cache along with when its oldest body was fetched."""
+    try:
+        cache_checkpoint.save(default_account.cache, default_account.auth)
+    except Exception as e:
+        print(f"Failed to save the read cache: {str(e)}")
+
+
+@app.on_event("startup")
+def start_cache_checkpoints():
+    if CACHE_CHECKPOINT_SECONDS:
+        def checkpoint():
+            while not time.sleep(CACHE_CHECKPOINT_SECONDS):
+                save_read_cache()
+
+        threading.Thread(target=checkpoint, daemon=True, name="read-cache-checkpoint").start()
+
+
+@app.on_event("shutdown")
+def checkpoint_on_shutdown():
+    save_read_cache()
+
+
+@app.on_event("startup")
+def warm_up_models():
+    """Load both Ollama models in the background so the first request doesn't pay for it."""
+    threading.Thread(target=warm_up, args=([EXTRACTION_MODEL, ANSWER_MODEL], OLLAMA_KEEP_ALIVE),
+                     daemon=True, name="ollama-warm-up").start()
+
+
+def fetch_member_actions(since):
+    """Fetch the member's board/list/card actions after action id `since`, newest first."""
+    url = "https://api.trello.com/1/members/me/actions"
+    params = {
+        "filter": ",".join(ACTION_EVENTS),
+        "limit": 1000 if since else 1,
+        **current().auth
+    }
+    if since:
+        params["since"] = since
+    response = trello_get(url, params)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch Trello actions. {response.text}")
+    return orjson.loads(response.content)
+
+
+@app.on_event("startup")
+def start_action_polling():
+    """Turn changes made in Trello itself into events for connected clients."""
+    if EVENT_POLL_SECONDS:
+        threading.Thread(target=poll_actions, daemon=True, name="trello-action-poller",
+                         args=(handle_trello_action, fetch_member_actions, EVENT_POLL_SECONDS, threading.Event())).start()
+
+
+def handle_trello_action(action, account=None):
+    """Apply a Trello action, from polling or a webhook, to an account's connected clients and read cache."""
+    account = account or default_account
+    if event_bus.publish_action(action, account=account.partition):
+        apply_action(account.cache, action)
+
+
+def member_board_ids():
+    url = "https://api.trello.com/1/members/me/boards"
+    response = trello_get(url, {"fields": "id", **current().auth}, tags=("member",))
+    if response.status_code != 200:
+        raise Exception(f"Failed to retrieve Trello boards. {response.text}")
+    return [board["id"] for board in orjson.loads(response.content)]
+
+
+@app.on_event("startup")
+def start_webhooks():
+    """Register webhooks for the member's boards in the background when a callback URL is configured."""
+    if not WEBHOOK_CALLBACK_URL:
+        return
+
+    def register():
+        try:
+            _, failed = register_webhooks(WEBHOOK_CALLBACK_URL, member_board_ids(), default_account.auth,
+                                          default_account.limiter)
+        except Exception as e:
+            failed = [{"error": str(e)}]
+        if failed:
+            # Boards without a webhook would go stale for the long TTL, so reads stay short-lived
+            default_account.cache.ttl = ACCOUNT_CACHE_TTL
+            print(f"Failed to register {len(failed)} Trello webhooks: {failed[0]['error']}")
+
+    threading.Thread(target=register, daemon=True, name="trello-webhooks").start()
+
+
+def webhook_callback_url(account_id=None):
+    """The callback URL of an account's webhooks; accounts other than the default one are named in its query."""
+    if not account_id:
+        return WEBHOOK_CALLBACK_URL
+    return f"{WEBHOOK_CALLBACK_URL}{'&' if '?' in WEBHOOK_CALLBACK_URL else '?'}account={account_id}"
+
+
+@app.post("/webhooks/register")
+def register_board_webhooks():
+    """Register webhooks for any of the member's boards that don't have one yet."""
+
+    if not WEBHOOK_CALLBACK_URL:
+        return {"error": "WEBHOOK_CALLBACK_URL is not set."}
+    account = current()
+    try:
+        registered, failed = register_webhooks(webhook_callback_url(account.partition), member_board_ids(),
+                                               account.auth, account.limiter)
+    except Exception as e:
+        return {"error": str(e)}
+    if not failed:
+        # Webhooks now keep this account's cache fresh
+        account.cache.ttl = READ_CACHE_TTL
+    return {"registered": registered, "failed": failed}
+
+
+@app.head("/trello/webhook")
+def confirm_webhook():
+    """Trello checks the callback URL answers HEAD with 200 before creating a webhook."""
+
+    return Response(status_code=200)
+
+
+@app.post("/trello/webhook")
+async def receive_webhook(request: Request):
+    """Apply a signed Trello webhook call to the read cache and connected clients."""
+
+    body = await request.body()
+    signature = request.headers.get("X-Trello-Webhook")
+    account_id = request.query_params.get("account")
+    callback_url = webhook_callback_url(account_id) if WEBHOOK_CALLBACK_URL else str(request.url)
+    if not verify_signature(TRELLO_API_SECRET, body, callback_url, signature):
+        return ORJSONResponse({"error": "Invalid webhook signature."}, status_code=401)
+
+    action = orjson.loads(body).get("action")
+    account = accounts.find(account_id)
+    if action and account:
+        await run_in_threadpool(handle_trello_action, action, account)
+    elif action:
+        # The account has no cache loaded in this process, but its clients still get the event
+        event_bus.publish_action(action, account=account_id)
+    return Response(status_code=200)
+
+
+@app.get("/changes")
+def get_changes(since: int = 0, limit: int = 5000):
+    """Boards, lists and cards created, changed or deleted after the `since` cursor.
+
+    Pass the returned cursor as `since` on the next sync; `resync` means the cursor is too old
+    and the client should reload everything.
+    """
+
+    change_log.prune(time.time() - CHANGE_LOG_RETENTION_DAYS * 86400)
+    return change_log.since(since, max(1, min(limit, 5000)), current().partition)
+
+
+@app.get("/events")
+async def stream_events(request: Request, after: int = None):
+    """Server-sent events of board, list and card changes; reconnects resume after Last-Event-ID."""
+
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    account = current().partition
+
+    async def sse():
+        async for event in event_bus.subscribe(after, account):
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: ".encode() + orjson.dumps(event) + b"\n\n"
+
+    # Content-Encoding keeps the compression middleware from buffering events
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "Content-Encoding": "identity"})
+
+
+@app.websocket("/ws")
+async def board_events_socket(websocket: WebSocket, after: int = None):
+    """The same change events as /events over a WebSocket, which React Native supports natively.
+
+    The account comes from the same headers as HTTP requests, which the middleware doesn't see here.
+    """
+
+    token = websocket.headers.get("X-Trello-Token")
+    key = websocket.headers.get("X-Trello-Key") or TRELLO_API_KEY
+    try:
+        account = await run_in_threadpool(accounts.get, key, token) if token else default_account
+    except (AccountError, CircuitOpen, requests.RequestException):
+        # 1008: policy violation, the token couldn't be checked or was rejected
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        async for event in event_bus.subscribe(after, account.partition):
+            await websocket.send_text(orjson.dumps(event).decode())
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Poll an async job; `wait` long-polls up to that many seconds for it to finish.
+
+    Only the account that submitted a job sees it; to any other it doesn't exist. Long polls wait
+    on the event loop, so they don't hold threads the sync endpoints need.
+    """
+
+    job = None
+    if await run_in_threadpool(job_queue.owner, job_id) == current().partition:
+        if wait > 0:
+            loop, finished = asyncio.get_running_loop(), asyncio.Event()
+            job_queue.on_finished(job_id, lambda: loop.call_soon_threadsafe(finished.set))
+            try:
+                await asyncio.wait_for(finished.wait(), min(wait, 60))
+            except asyncio.TimeoutError:
+                pass
+        job = await run_in_threadpool(job_queue.get, job_id)
+    if not job:
+        return ORJSONResponse({"error": f"Job '{job_id}' not found."}, status_code=404)
+    return job
+
+
+def total(stats):
+    """Add up counters of the same names across accounts."""
+    totals = {}
+    for counters in stats:
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Report counters for the backend's upstream Trello traffic."""
+
+    loaded = accounts.all()
+    return {
+        "accounts": {**accounts.stats, "loaded": len(loaded)},
+        "singleflight": {**total(account.reads.stats for account in loaded),
+                         "in_flight": sum(account.reads.in_flight() for account in loaded)},
+        "jobs": job_queue.metrics(),
+        "event_subscribers": event_bus.subscriber_count(),
+        "llm": llm_stats,
+        "cache": {**total(account.cache.stats for account in loaded),
+                  "entries": sum(len(account.cache) for account in loaded)},
+        "rate_limit_waited_seconds": round(sum(account.limiter.waited_seconds for account in loaded), 3),
+        "upstream": trello.metrics(),
+        "admission": {name: pool.metrics() for name, pool in admission.items()},
+    }
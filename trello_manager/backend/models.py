@@ -0,0 +1,67 @@
+import sys
+from dataclasses import dataclass
+
+import orjson
+
+
+@dataclass(slots=True)
+class Board:
+    """A Trello board, reduced to the fields the backend uses."""
+    id: str
+    name: str
+    desc: str = ""
+    closed: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data.get("name", ""), data.get("desc") or "", data.get("closed", False))
+
+
+@dataclass(slots=True)
+class TrelloList:
+    """A Trello list, reduced to the fields the backend uses."""
+    id: str
+    name: str
+    idBoard: str = ""
+    closed: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data.get("name", ""), sys.intern(data.get("idBoard", "")), data.get("closed", False))
+
+
+@dataclass(slots=True)
+class Card:
+    """A Trello card, reduced to the fields the backend uses."""
+    id: str
+    name: str
+    idList: str = ""
+    desc: str = ""
+    due: str | None = None
+    closed: bool = False
+    idLabels: tuple = ()
+    idMembers: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        # Parent, label and member ids repeat across many cards, so share one string per id
+        return cls(
+            data["id"],
+            data.get("name", ""),
+            sys.intern(data.get("idList", "")),
+            data.get("desc") or "",
+            data.get("due"),
+            data.get("closed", False),
+            tuple(sys.intern(i) for i in data.get("idLabels", ())),
+            tuple(sys.intern(i) for i in data.get("idMembers", ())),
+        )
+
+
+def decode(model, raw):
+    """Decode one model from raw Trello JSON bytes."""
+    return model.from_dict(orjson.loads(raw))
+
+
+def decode_many(model, raw):
+    """Decode a list of models from a raw Trello JSON array."""
+    return [model.from_dict(item) for item in orjson.loads(raw)]
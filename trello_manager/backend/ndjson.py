@@ -0,0 +1,74 @@
+import codecs
+import json
+import zlib
+
+import orjson
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array as its bytes arrive, without buffering the whole body."""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != "[":
+                    raise ValueError("Expected a JSON array from Trello")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break  # Element is incomplete, wait for the next chunk
+            yield item
+            buffer = buffer[end:]
+
+
+def iter_lines(chunks):
+    """Yield the lines of a byte stream, gunzipping it first when it starts with the gzip header."""
+    decompressor = None
+    buffer = b""
+    for chunk in chunks:
+        if decompressor is None:
+            decompressor = zlib.decompressobj(wbits=31) if (buffer + chunk).startswith(GZIP_MAGIC) else False
+        buffer += decompressor.decompress(chunk) if decompressor else chunk
+        *lines, buffer = buffer.split(b"\n")
+        yield from lines
+    if decompressor:
+        buffer += decompressor.flush()
+    yield from buffer.split(b"\n")
+
+
+def iter_records(chunks):
+    """Decode an NDJSON byte stream, optionally gzipped, one object at a time."""
+    for line in iter_lines(chunks):
+        if line.strip():
+            yield orjson.loads(line)
+
+
+def gzip_chunks(chunks, level=6, min_size=64 * 1024):
+    """Gzip a byte stream on the fly, emitting compressed blocks of roughly min_size input bytes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            yield compressor.compress(b"".join(pending))
+            pending, size = [], 0
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+
+# Model labels mapped onto the spaCy labels extract_entities looks for (CoNLL and OntoNotes tag sets)
+LABEL_MAP = {"PER": "PERSON", "PERSON": "PERSON", "ORG": "ORG", "PRODUCT": "PRODUCT", "MISC": "PRODUCT", "DATE": "DATE"}
+
+
+def merge_entities(text, tags, tokens, offsets, special_tokens_mask):
+    """Join tagged tokens into (text, spaCy label) entities.
+
+    A token touching the open entity extends it only when it continues the same word: a "##"
+    word piece, or letters and digits running on from the entity's last character. Punctuation
+    right after a name, as in "Acme.", ends the entity and is left out of it.
+    """
+    entities = []
+    current = None  # [label, start, end]
+    for tag, token, (start, end), special in zip(tags, tokens, offsets, special_tokens_mask):
+        if special or start == end:
+            continue
+        prefix, _, label = tag.partition("-") if "-" in tag else ("O", "", "")
+        if current and start == current[2]:
+            extends = token.startswith("##") or text[start - 1:start + 1].isalnum()
+        else:
+            extends = current is not None and prefix == "I" and label == current[0]
+        if extends:
+            # Word pieces and I- tags of the next word extend the open entity
+            current[2] = end
+            continue
+        if current:
+            entities.append(current)
+            current = None
+        # Punctuation tagged as part of a name doesn't start one of its own
+        if prefix in ("B", "I") and any(char.isalnum() for char in text[start:end]):
+            current = [label, start, end]
+    if current:
+        entities.append(current)
+
+    return [(text[start:end], LABEL_MAP[label]) for label, start, end in entities if label in LABEL_MAP]
+
+
+class OnnxNer:
+    """Token-classification NER running an exported, int8-quantised transformer on ONNX Runtime.
+
+    model_dir holds model.onnx (or model_quantized.onnx), tokenizer.json and the config.json
+    with id2label, as written by scripts/export_onnx_ner.py. Only labels the model has are found:
+    a CoNLL-2003 model has no DATE, so it never fills the due date.
+    """
+
+    def __init__(self, model_dir, threads=1):
+        # Only needed with NER_BACKEND=onnx, so merge_entities works without them
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=128)
+        with open(os.path.join(model_dir, "config.json")) as f:
+            self.id2label = {int(i): label for i, label in json.load(f)["id2label"].items()}
+
+    def __call__(self, text):
+        """Return the entities in text as (text, spaCy label) pairs."""
+        encoding = self.tokenizer.encode(text)
+        inputs = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids], dtype=np.int64),
+        }
+        logits = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+        tags = [self.id2label[i] for i in logits[0].argmax(-1)]
+
+        return merge_entities(text, tags, encoding.tokens, encoding.offsets, encoding.special_tokens_mask)
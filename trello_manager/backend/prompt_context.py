@@ -0,0 +1,50 @@
+import re
+
+# Rough characters per token for English text with llama-family tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate, good enough for budgeting without loading a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate(text, max_chars):
+    """Cut text at a word boundary so it fits in max_chars, marking the cut."""
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1].rsplit(" ", 1)[0]
+    return cut + "…"
+
+
+def summarize_conversation(request, answer, max_chars=240):
+    """Short extractive summary stored with each conversation: the request and the answer's first sentence."""
+    first_sentence = re.split(r"(?<=[.!?])\s", " ".join(answer.split()), maxsplit=1)[0]
+    return truncate(f"Q: {request} A: {first_sentence}", max_chars)
+
+
+def build_history(documents, metadatas, token_budget, max_item_chars=400):
+    """Pick past conversations, most relevant first, until the token budget is spent.
+
+    Uses the stored summary when there is one, drops repeats of the same request, and
+    truncates long entries. Returns the history text and the number of entries used.
+    """
+    seen = set()
+    lines = []
+    used = 0
+    for document, metadata in zip(documents, metadatas or [{}] * len(documents)):
+        metadata = metadata or {}
+        request_key = " ".join((metadata.get("request") or document).lower().split())
+        if request_key in seen:
+            continue
+        seen.add(request_key)
+
+        entry = "- " + truncate(metadata.get("summary") or document, max_item_chars)
+        cost = estimate_tokens(entry) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(entry)
+        used += cost
+
+    return "\n".join(lines) if lines else "No relevant past conversations found.", len(lines)
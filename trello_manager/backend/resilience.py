@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Seconds to wait for Trello: connect timeout, then read timeout by "METHOD /endpoint" or by method
+CONNECT_TIMEOUT = 3.05
+TIMEOUTS = {
+    "GET": 10,
+    "POST": 15,
+    "PUT": 10,
+    "DELETE": 10,
+    "POST /boards": 30,  # Copying a board with its cards
+    "POST /lists/:id/archiveAllCards": 30,
+    "POST /lists/:id/moveAllCards": 30,
+}
+
+# A GET still running after its endpoint's p95 latency gets a duplicate; the first answer wins
+HEDGE_MIN_DELAY = 0.05
+HEDGE_DEFAULT_DELAY = 1.0  # Until an endpoint has LATENCY_SAMPLES_MIN samples
+LATENCY_SAMPLES = 200
+LATENCY_SAMPLES_MIN = 20
+
+# Hedges are capped at this share of requests, so a slow Trello isn't sent much more traffic
+HEDGE_BUDGET = 0.1
+
+# Consecutive failures that open the breaker, and seconds before it lets a trial request through
+BREAKER_FAILURES = 5
+BREAKER_RESET_SECONDS = 30
+
+# Keep-alive connection pools kept at once, one per Trello token; the least recently used is dropped
+MAX_SESSIONS = 256
+
+ID_SEGMENT = re.compile(r"/[0-9a-f]{24}(?=/|$)|/[0-9a-zA-Z]{64,}(?=/|$)")
+OAUTH_TOKEN = re.compile(r'oauth_token="([^"]+)"')
+
+
+class CircuitOpen(Exception):
+    """Trello has been failing, so the request was not sent."""
+
+
+def endpoint_of(url):
+    """The endpoint a Trello URL belongs to, with ids and tokens replaced: /boards/:id/lists.
+
+    A trailing slash is dropped, so /boards/ is /boards.
+    """
+    path = urlsplit(url).path
+    if path.startswith("/1/"):
+        path = path[2:]
+    return ID_SEGMENT.sub("/:id", path.rstrip("/")) or "/"
+
+
+def token_of(kwargs):
+    """The Trello token a request is made with, from its params or OAuth header, or None."""
+    params = kwargs.get("params")
+    if isinstance(params, dict) and params.get("token"):
+        return params["token"]
+    match = OAUTH_TOKEN.search((kwargs.get("headers") or {}).get("Authorization", ""))
+    return match.group(1) if match else None
+
+
+class CircuitBreaker:
+    """Closed while Trello answers; open, failing fast, after `failures` failures in a row.
+
+    After reset_seconds one trial request is let through (half open); its outcome closes or
+    reopens the breaker.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failed = 0
+        self._opened_at = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failed += 1
+            if self._trial or (self._opened_at is None and self._failed >= self.failures):
+                self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class Upstream:
+    """Trello calls with per-endpoint timeouts, hedged GETs and a circuit breaker.
+
+    request() mirrors requests.request and returns a requests.Response, raising CircuitOpen
+    instead of calling Trello while the breaker is open. Each Trello token gets its own
+    keep-alive connection pool, so one account's bulk work can't hold every connection.
+    """
+
+    def __init__(self, timeouts=None, max_workers=32, max_sessions=MAX_SESSIONS):
+        self.timeouts = timeouts or TIMEOUTS
+        self.breaker = CircuitBreaker()
+        self.max_workers = max_workers
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # token -> requests.Session
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trello-upstream")
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "failures": 0, "rejected": 0}
+
+    def session(self, token):
+        """The keep-alive session for a token, so requests don't each pay for a new TCP and TLS handshake."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[token] = session
+                # A dropped session's connections close once requests still using it are done
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(token)
+            return session
+
+    def timeout(self, method, endpoint):
+        return CONNECT_TIMEOUT, self.timeouts.get(f"{method} {endpoint}", self.timeouts.get(method, 10))
+
+    def hedge_delay(self, endpoint):
+        """The endpoint's recent p95 latency, or a default until there are enough samples."""
+        with self._lock:
+            samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < LATENCY_SAMPLES_MIN:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, samples[int(len(samples) * 0.95) - 1])
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _send(self, method, url, endpoint, kwargs):
+        start = time.monotonic()
+        try:
+            response = self.session(token_of(kwargs)).request(method, url, timeout=self.timeout(method, endpoint), **kwargs)
+        except requests.Timeout:
+            self._count("timeouts")
+            self.breaker.failure()
+            raise
+        except Exception:
+            # Any other failure counts too, or a failed half-open trial would leave the breaker shut for good
+            self._count("failures")
+            self.breaker.failure()
+            raise
+        if response.status_code >= 500:
+            self._count("failures")
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+            with self._lock:
+                self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_SAMPLES)).append(time.monotonic() - start)
+        return response
+
+    def request(self, method, url, **kwargs):
+        method = method.upper()
+        endpoint = endpoint_of(url)
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpen(f"Trello is failing, not calling {method} {endpoint} for now.")
+        self._count("requests")
+        if method != "GET":
+            return self._send(method, url, endpoint, kwargs)
+
+        primary = self._pool.submit(self._send, method, url, endpoint, kwargs)
+        done, _ = wait([primary], timeout=self.hedge_delay(endpoint))
+        if done or not self._may_hedge():
+            return primary.result()
+
+        self._count("hedges")
+        hedge = self._pool.submit(self._send, method, url, endpoint, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result().status_code < 500:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    for loser in pending:
+                        # The slower copy is dropped, closing any streamed body it opens
+                        loser.add_done_callback(lambda f: f.exception() is None and f.result().close())
+                    return future.result()
+        # Both failed: report the primary's outcome
+        return primary.result()
+
+    def _may_hedge(self):
+        with self._lock:
+            return self.stats["hedges"] < self.stats["requests"] * HEDGE_BUDGET + 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def metrics(self):
+        with self._lock:
+            endpoints = {endpoint: sorted(samples) for endpoint, samples in self._latencies.items()}
+        return {
+            **self.stats,
+            "sessions": len(self._sessions),
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "p95_ms": {endpoint: round(samples[int(len(samples) * 0.95) - 1] * 1000, 1)
+                       for endpoint, samples in endpoints.items() if len(samples) >= LATENCY_SAMPLES_MIN},
+        }
+
+
+# Shared by every module and account that calls Trello, so they share one breaker and one view of latency
+trello = Upstream()
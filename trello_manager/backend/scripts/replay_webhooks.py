@@ -0,0 +1,105 @@
+"""Replay recorded Trello webhook payloads, to check cache invalidation without Trello calling us.
+
+Offline (default) applies each payload to a fresh read cache seeded with the objects it touches
+and prints which cached bodies were patched or dropped. With --url the payloads are signed with
+TRELLO_API_SECRET and POSTed to a running backend, whose WEBHOOK_CALLBACK_URL must be the same
+URL. Run from the backend folder:
+
+    python scripts/replay_webhooks.py
+    python scripts/replay_webhooks.py --url http://127.0.0.1:8000/trello/webhook
+"""
+import base64
+import glob
+import hashlib
+import hmac
+import os
+import sys
+
+import orjson
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from cache import ReadCache
+from webhooks import apply_action, verify_signature
+
+PAYLOAD_DIR = os.path.join(HERE, "webhook_payloads")
+
+
+def load_payloads():
+    for path in sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.json"))):
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f.read()
+
+
+def seeded_cache(action):
+    """A cache holding the member's boards, the board's lists and the cards of every list the action names.
+
+    The object an update changed is seeded with its old values, as it was cached before the update.
+    """
+    data = action["data"]
+    old = data.get("old") or {}
+    cache = ReadCache(ttl=60)
+    board = data.get("board", {})
+    if board:
+        name = old.get("name", board.get("name")) if "Board" in action["type"] else board.get("name")
+        cache.put("boards", orjson.dumps([{"id": board["id"], "name": name}]), ["member"])
+    lists = [data[name] for name in ("list", "listBefore", "listAfter") if data.get(name)]
+    if board and lists:
+        cache.put("lists", orjson.dumps([{"id": lst["id"], "name": lst.get("name")} for lst in lists]),
+                  [f"board:{board['id']}"])
+    if "card" in data:
+        card = {"id": data["card"]["id"], "name": old.get("name", data["card"].get("name"))}
+        for lst in lists:
+            cache.put(f"cards {lst['name']}", orjson.dumps([card]), [f"list:{lst['id']}"])
+        cache.put("card fields", b"{}", [f"card:{card['id']}"])
+    return cache
+
+
+def replay_offline():
+    for name, body in load_payloads():
+        action = orjson.loads(body)["action"]
+        cache = seeded_cache(action)
+        before = {key: content for key, (_, content, _) in cache._entries.items()}
+        apply_action(cache, action)
+        after = {key: content for key, (_, content, _) in cache._entries.items()}
+
+        print(f"{name} ({action['type']})")
+        for key, content in before.items():
+            if key not in after:
+                print(f"  dropped  {key}")
+            elif after[key] != content:
+                print(f"  patched  {key}: {after[key].decode()}")
+            else:
+                print(f"  kept     {key}")
+
+
+def sign(secret, body, callback_url):
+    digest = hmac.new(secret.encode(), body + callback_url.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+def replay_to(url):
+    import requests
+
+    secret = os.getenv("TRELLO_API_SECRET")
+    if not secret:
+        sys.exit("TRELLO_API_SECRET is not set.")
+    for name, body in load_payloads():
+        signature = sign(secret, body, url)
+        assert verify_signature(secret, body, url, signature)
+        response = requests.post(url, data=body, headers={"X-Trello-Webhook": signature,
+                                                          "Content-Type": "application/json"})
+        print(f"{name}: {response.status_code}")
+
+    metrics = requests.get(url.split("/trello/")[0] + "/metrics").json()
+    print(f"cache: {metrics.get('cache')}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--url":
+        replay_to(sys.argv[2])
+    elif len(sys.argv) == 1:
+        replay_offline()
+    else:
+        sys.exit(__doc__)
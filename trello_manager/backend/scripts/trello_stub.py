@@ -0,0 +1,223 @@
+"""A local stand-in for the parts of the Trello REST API the backend uses, with injected latency and failures.
+
+Serves boards, lists and cards held in memory under /1/... and accepts the writes the backend
+makes. Used by the benchmarks; also runnable on its own:
+
+    python scripts/trello_stub.py --port 8765 --slow-rate 0.05 --slow-seconds 1 --fail-rate 0.01
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import orjson
+
+_ids = itertools.count(1)
+
+
+def new_id():
+    """24 hex characters, growing with creation order like Trello's ids."""
+    return f"{int(time.time()):08x}{next(_ids):016x}"
+
+
+class TrelloState:
+    """Boards, lists and cards kept in memory."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.boards = {}
+        self.lists = {}
+        self.cards = {}
+        self.labels = {}
+        self.checklists = {}
+
+    def add_board(self, name, desc=""):
+        board = {"id": new_id(), "name": name, "desc": desc, "closed": False, "url": ""}
+        self.boards[board["id"]] = board
+        return board
+
+    def add_list(self, board_id, name, pos=None):
+        lst = {"id": new_id(), "name": name, "idBoard": board_id, "closed": False, "pos": pos or len(self.lists) + 1}
+        self.lists[lst["id"]] = lst
+        return lst
+
+    def add_card(self, list_id, name, desc="", pos=None):
+        card = {"id": new_id(), "name": name, "desc": desc, "idList": list_id,
+                "idBoard": self.lists[list_id]["idBoard"], "closed": False, "pos": pos or len(self.cards) + 1,
+                "labels": [], "idLabels": [], "due": None}
+        self.cards[card["id"]] = card
+        return card
+
+    def add_label(self, board_id, name, color=None):
+        label = {"id": new_id(), "idBoard": board_id, "name": name, "color": color}
+        self.labels[label["id"]] = label
+        return label
+
+    def add_checklist(self, card_id, name, pos=None):
+        checklist = {"id": new_id(), "idCard": card_id, "idBoard": self.cards[card_id]["idBoard"], "name": name,
+                     "pos": pos or len(self.checklists) + 1, "checkItems": []}
+        self.checklists[checklist["id"]] = checklist
+        return checklist
+
+    def add_check_item(self, checklist_id, name, pos=None, checked=False):
+        item = {"id": new_id(), "name": name, "pos": pos or 1, "state": "complete" if checked else "incomplete"}
+        self.checklists[checklist_id]["checkItems"].append(item)
+        return item
+
+    def seed(self, boards=1, lists=5, cards=100):
+        """Fill with boards of `lists` lists holding `cards` cards each; every tenth card has a checklist."""
+        for b in range(boards):
+            board = self.add_board(f"Board {b + 1}")
+            labels = [self.add_label(board["id"], name, color) for name, color in
+                      (("Bug", "red"), ("Feature", "green"), ("Chore", "blue"))]
+            for l in range(lists):
+                lst = self.add_list(board["id"], f"List {l + 1}")
+                for c in range(cards):
+                    card = self.add_card(lst["id"], f"Card {c + 1}", desc="x" * 40)
+                    card["idLabels"] = [labels[c % len(labels)]["id"]]
+                    if c % 10 == 0:
+                        checklist = self.add_checklist(card["id"], "Steps")
+                        for i in range(3):
+                            self.add_check_item(checklist["id"], f"Step {i + 1}", i + 1, checked=i == 0)
+        return self
+
+
+def project(obj, fields):
+    if not fields or fields == "all":
+        return obj
+    return {"id": obj["id"], **{name: obj.get(name) for name in fields.split(",")}}
+
+
+def make_handler(state, faults):
+    """Request handler serving `state`; `faults` holds latency, slow_rate, slow_seconds and fail_rate."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = orjson.dumps(body)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_any(self, method):
+            url = urlsplit(self.path)
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                params.update(orjson.loads(self.rfile.read(length)))
+
+            time.sleep(faults["latency"] + (faults["slow_seconds"] if random.random() < faults["slow_rate"] else 0))
+            if random.random() < faults["fail_rate"]:
+                return self.send_json(500, {"message": "injected failure"})
+
+            with state.lock:
+                status, body = route(method, url.path, params)
+            self.send_json(status, body)
+
+        def do_GET(self):
+            self.handle_any("GET")
+
+        def do_POST(self):
+            self.handle_any("POST")
+
+        def do_PUT(self):
+            self.handle_any("PUT")
+
+        def do_DELETE(self):
+            self.handle_any("DELETE")
+
+    def route(method, path, params):
+        fields = params.get("fields")
+        parts = path.strip("/").split("/")[1:]  # Drop the API version
+
+        if method == "GET" and parts == ["members", "me", "boards"]:
+            return 200, [project(b, fields) for b in state.boards.values() if not b["closed"]]
+        if method == "GET" and re.fullmatch(r"boards/\w+/(lists|cards|labels|checklists)", "/".join(parts)):
+            board_id, kind = parts[1], parts[2]
+            objs = {"lists": state.lists, "cards": state.cards, "labels": state.labels,
+                    "checklists": state.checklists}[kind]
+            show_closed = params.get("filter") == "all"
+            return 200, [project(o, fields) | ({"checkItems": o["checkItems"]} if kind == "checklists" else {})
+                         for o in objs.values() if o["idBoard"] == board_id and (show_closed or not o.get("closed"))]
+        if method == "GET" and len(parts) == 3 and parts[0] == "lists" and parts[2] == "cards":
+            return 200, [project(c, fields) for c in state.cards.values() if c["idList"] == parts[1] and not c["closed"]]
+        if method == "GET" and len(parts) == 3 and parts[0] == "cards" and parts[2] == "checklists":
+            return 200, [c for c in state.checklists.values() if c["idCard"] == parts[1]]
+        if method == "GET" and len(parts) == 2 and parts[0] == "boards" and parts[1] in state.boards:
+            # Nested resources, e.g. ?lists=open&list_fields=name, as the analytics snapshot reads them
+            board = project(state.boards[parts[1]], fields)
+            for kind, objs in (("lists", state.lists), ("cards", state.cards), ("labels", state.labels)):
+                if params.get(kind) in ("open", "all"):
+                    board[kind] = [project(o, params.get(f"{kind[:-1]}_fields")) for o in objs.values()
+                                   if o["idBoard"] == parts[1] and (params[kind] == "all" or not o.get("closed"))]
+            if params.get("members"):
+                board["members"] = [{"id": "5" * 24, "fullName": "Stub Member", "username": "stub"}]
+            return 200, board
+        if method == "GET" and len(parts) == 2 and parts[0] in ("boards", "lists", "cards"):
+            obj = {"boards": state.boards, "lists": state.lists, "cards": state.cards}[parts[0]].get(parts[1])
+            return (200, project(obj, fields)) if obj else (404, {"message": "not found"})
+
+        if method == "POST" and parts == ["boards"]:
+            return 200, state.add_board(params.get("name", ""), params.get("desc", ""))
+        if method == "POST" and parts == ["lists"]:
+            return 200, state.add_list(params["idBoard"], params.get("name", ""), params.get("pos"))
+        if method == "POST" and parts == ["cards"]:
+            return 200, state.add_card(params["idList"], params.get("name", ""), params.get("desc", ""), params.get("pos"))
+        if method == "POST" and parts == ["labels"]:
+            return 200, state.add_label(params["idBoard"], params.get("name", ""), params.get("color"))
+        if method == "POST" and parts == ["checklists"]:
+            return 200, state.add_checklist(params["idCard"], params.get("name", ""), params.get("pos"))
+        if method == "POST" and len(parts) == 3 and parts[0] == "checklists" and parts[2] == "checkItems":
+            return 200, state.add_check_item(parts[1], params.get("name", ""), params.get("pos"),
+                                             params.get("checked") == "true")
+        if method == "PUT" and len(parts) == 2 and parts[0] in ("lists", "cards"):
+            obj = (state.lists if parts[0] == "lists" else state.cards).get(parts[1])
+            if not obj:
+                return 404, {"message": "not found"}
+            obj.update({name: value for name, value in params.items() if name in obj})
+            return 200, obj
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "boards":
+            return (200, {}) if state.boards.pop(parts[1], None) else (404, {"message": "not found"})
+        return 404, {"message": f"{method} {path} is not stubbed"}
+
+    return Handler
+
+
+def start_stub(state=None, port=0, slow_rate=0.0, slow_seconds=1.0, fail_rate=0.0, latency=0.0):
+    """Serve the stub in a background thread; returns (server, base URL like http://127.0.0.1:port/1)."""
+    state = state or TrelloState().seed()
+    faults = {"latency": latency, "slow_rate": slow_rate, "slow_seconds": slow_seconds, "fail_rate": fail_rate}
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state, faults))
+    server.daemon_threads = True
+    server.state = state
+    server.faults = faults
+    threading.Thread(target=server.serve_forever, daemon=True, name="trello-stub").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=int(os.getenv("TRELLO_STUB_PORT", "8765")))
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-seconds", type=float, default=1.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--lists", type=int, default=5, help="lists per board")
+    parser.add_argument("--cards", type=int, default=100, help="cards per list")
+    args = parser.parse_args()
+    server, url = start_stub(TrelloState().seed(lists=args.lists, cards=args.cards), args.port, args.slow_rate,
+                             args.slow_seconds, args.fail_rate, args.latency)
+    print(f"Trello stub on {url}", flush=True)
+    threading.Event().wait()
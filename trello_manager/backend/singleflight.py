@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one call whose result every caller shares."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "collapsed": 0}
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already in flight for key and return its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats["calls"] += 1
+            else:
+                self.stats["collapsed"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
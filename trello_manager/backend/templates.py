@@ -0,0 +1,50 @@
+import sqlite3
+
+import orjson
+
+from board_builder import execute_plan, plan_layout
+
+
+class TemplateStore:
+    """Named board templates in SQLite, each a Trello board to copy and/or a layout of lists and cards."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS board_templates (name TEXT PRIMARY KEY, board_id TEXT, layout BLOB)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def save(self, name, board_id=None, layout=None):
+        """Store a template; layout is a list of (list name, card names) pairs."""
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO board_templates VALUES (?, ?, ?)",
+                       (name.lower(), board_id, orjson.dumps(layout or [])))
+
+    def get(self, name):
+        with self._connect() as db:
+            row = db.execute("SELECT name, board_id, layout FROM board_templates WHERE name = ?",
+                             (name.lower(),)).fetchone()
+        return {"name": row[0], "board_id": row[1], "layout": orjson.loads(row[2])} if row else None
+
+    def all(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT name, board_id, layout FROM board_templates ORDER BY name").fetchall()
+        return [{"name": name, "board_id": board_id, "layout": orjson.loads(layout)} for name, board_id, layout in rows]
+
+    def set_board(self, name, board_id):
+        with self._connect() as db:
+            db.execute("UPDATE board_templates SET board_id = ? WHERE name = ?", (board_id, name.lower()))
+
+
+def template_board_id(store, journal, template, auth, limiter):
+    """Return the Trello board a template copies from, building it from the layout on first use."""
+    if template["board_id"]:
+        return template["board_id"]
+
+    name = template["name"]
+    plan = plan_layout(f"Template: {name}", template["layout"])
+    board, _, _ = execute_plan(journal, f"template:{name}", plan, auth, limiter)
+    store.set_board(name, board.id)
+    return board.id
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules import each other by name, as they do when main2 runs from the backend folder
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,43 @@
+from cache import CacheCheckpoint, ReadCache
+
+AUTH = {"key": "k", "token": "t"}
+
+
+def key(url):
+    return url, tuple(sorted({"fields": "name", **AUTH}.items()))
+
+
+def test_restored_bodies_are_stale_until_refreshed(tmp_path):
+    cache = ReadCache(5)
+    cache.put(key("/boards/b1/lists"), b"[]", ["board:b1"])
+    checkpoint = CacheCheckpoint(str(tmp_path / "state.sqlite3"))
+    checkpoint.save(cache, AUTH)
+
+    restored = ReadCache(5)
+    keys = checkpoint.restore(restored, AUTH)
+    assert keys == [key("/boards/b1/lists")]
+    assert restored.get(keys[0]) is None
+    assert restored.get(keys[0], stale=True).content == b"[]"
+
+    restored.refresh(keys)
+    assert restored.get(keys[0]).content == b"[]"
+
+
+def test_restore_keeps_bodies_fetched_since_startup(tmp_path):
+    cache = ReadCache(5)
+    cache.put(key("/boards/b1/lists"), b"[]", ["board:b1"])
+    checkpoint = CacheCheckpoint(str(tmp_path / "state.sqlite3"))
+    checkpoint.save(cache, AUTH)
+
+    restored = ReadCache(5)
+    restored.put(key("/boards/b1/lists"), b"[1]", ["board:b1"])
+    assert checkpoint.restore(restored, AUTH) == []
+    assert restored.get(key("/boards/b1/lists")).content == b"[1]"
+
+
+def test_snapshot_is_only_restored_for_its_owner(tmp_path):
+    cache = ReadCache(5)
+    cache.put(key("/boards/b1/lists"), b"[]", ["board:b1"])
+    checkpoint = CacheCheckpoint(str(tmp_path / "state.sqlite3"))
+    checkpoint.save(cache, AUTH)
+    assert checkpoint.restore(ReadCache(5), {"key": "k", "token": "other"}) == []
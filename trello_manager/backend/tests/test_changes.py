@@ -0,0 +1,68 @@
+from changes import ChangeLog
+
+
+class RacingConnection:
+    """A connection that lets another writer append a change right after the rows of a sync are read."""
+
+    def __init__(self, db, append):
+        self.db = db
+        self.append = append
+
+    def __enter__(self):
+        self.db.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.db.__exit__(*exc)
+
+    def execute(self, sql, *args):
+        result = self.db.execute(sql, *args)
+        if sql.startswith("SELECT seq, type"):
+            rows = result.fetchall()
+            self.append()
+            return FetchedRows(rows)
+        return result
+
+
+class FetchedRows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_change_appended_during_sync_is_not_skipped(tmp_path, monkeypatch):
+    log = ChangeLog(str(tmp_path / "changes.sqlite3"))
+    log.append("card", "updated", {"id": "a"}, 1.0)
+    cursor = log.since(0)["cursor"]
+    log.append("card", "updated", {"id": "b"}, 2.0, account="other")
+
+    connect = log._connect
+
+    def append():
+        with connect() as other:
+            other.execute("INSERT INTO change_log (type, object_id, change, data, time) "
+                          "VALUES ('card', 'c', 'updated', '{\"id\": \"c\"}', 3.0)")
+
+    monkeypatch.setattr(log, "_connect", lambda: RacingConnection(connect(), append))
+    first = log.since(cursor)
+    monkeypatch.setattr(log, "_connect", connect)
+    second = log.since(first["cursor"])
+    assert first["cards"] + second["cards"] == [{"id": "c"}]
+
+
+def test_cursor_skips_other_accounts_rows(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite3"))
+    log.append("card", "updated", {"id": "a"}, 1.0, account="other")
+    body = log.since(0)
+    assert body["cards"] == [] and body["cursor"] == 1 and not body["has_more"]
+
+
+def test_has_more_stops_at_the_last_row_returned(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite3"))
+    for index in range(3):
+        log.append("card", "updated", {"id": str(index)}, 1.0)
+    body = log.since(0, limit=2)
+    assert body["has_more"] and body["cursor"] == 2
+    assert log.since(body["cursor"])["cards"] == [{"id": "2"}]
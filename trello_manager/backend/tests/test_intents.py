@@ -0,0 +1,55 @@
+import pytest
+
+from intents import detect_analytics, extract_entities
+
+
+@pytest.mark.parametrize("text", [
+    "What is a label in Trello?",
+    "What do most teams use Trello for?",
+    "explain late binding",
+    "How many boards can I have on the free plan?",
+    "How many cards can a board hold?",
+    "Count me in for the meeting",
+])
+def test_general_questions_are_left_to_the_llm(text):
+    info = extract_entities(text)
+    assert info["analytics"] is None
+    assert info["action_type"] != "list"
+
+
+@pytest.mark.parametrize("text, metric, group", [
+    ("How many cards do I have?", "count", "board"),
+    ("how many overdue cards per list?", "overdue", "list"),
+    ("Which board has the most overdue cards?", "overdue", "board"),
+    ("Show cards per label", "labels", "label"),
+    ("Who has the most cards?", "workload", "member"),
+    ("number of cards on each board", "count", "board"),
+])
+def test_card_count_questions(text, metric, group):
+    info = extract_entities(text)
+    assert info["action_type"] == "list"
+    assert info["analytics"] == {"metric": metric, "group": group, "ascending": False}
+
+
+def test_fewest_sorts_ascending():
+    assert detect_analytics("Which list has the fewest cards?")["ascending"]
+
+
+def test_lists_stop_at_the_cards_section():
+    info = extract_entities("create board X with lists: Todo, Review and add cards: Setup")
+    assert info["lists"] == ["Todo", "Review"]
+    assert info["cards"] == ["Setup"]
+
+
+def test_bulk_label_and_update():
+    info = extract_entities("add label urgent to all cards in Doing")
+    assert (info["action_type"], info["new_label"], info["source_list"]) == ("label", "urgent", "Doing")
+    info = extract_entities("mark every card in Done as complete")
+    assert (info["action_type"], info["source_list"], info["fields"]) == ("update", "Done", {"dueComplete": "true"})
+
+
+def test_bulk_command_board():
+    info = extract_entities("move all cards from Doing to Done on board Sprint")
+    assert (info["source_list"], info["target_list"], info["board"]) == ("Doing", "Done", "Sprint")
+    info = extract_entities("archive all cards in Done")
+    assert (info["source_list"], info["board"]) == ("Done", None)
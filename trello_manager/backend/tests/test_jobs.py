@@ -0,0 +1,24 @@
+import threading
+
+from jobs import JobQueue
+
+
+def test_on_finished_runs_when_the_job_finishes(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), {"prompt": 1})
+    release, called = threading.Event(), threading.Event()
+    job_id = queue.submit("prompt", {"account": "a"}, lambda payload, progress: release.wait(5) and {"answer": "ok"})
+
+    queue.on_finished(job_id, called.set)
+    assert not called.is_set()
+    release.set()
+    assert called.wait(5)
+    assert queue.get(job_id)["result"] == {"answer": "ok"}
+    assert queue.owner(job_id) == "a"
+
+
+def test_on_finished_runs_at_once_for_jobs_not_running(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), {"prompt": 1})
+    called = []
+    queue.on_finished("missing", lambda: called.append(True))
+    assert called == [True]
+    assert queue.owner("missing") is None
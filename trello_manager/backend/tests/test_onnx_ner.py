@@ -0,0 +1,42 @@
+from onnx_ner import merge_entities
+
+
+def spans(text, tokens):
+    """Offsets of each token in text, searched left to right."""
+    offsets, position = [], 0
+    for token in tokens:
+        start = text.index(token.removeprefix("##"), position)
+        position = start + len(token.removeprefix("##"))
+        offsets.append((start, position))
+    return offsets
+
+
+def entities(text, tagged):
+    tokens = [token for token, _ in tagged]
+    tags = [tag for _, tag in tagged]
+    return merge_entities(text, tags, tokens, spans(text, tokens), [0] * len(tokens))
+
+
+def test_trailing_punctuation_is_not_part_of_the_entity():
+    text = "Delete the board Acme."
+    tagged = [("Delete", "O"), ("the", "O"), ("board", "O"), ("Acme", "B-ORG"), (".", "I-ORG")]
+    assert entities(text, tagged) == [("Acme", "ORG")]
+
+
+def test_untagged_trailing_punctuation():
+    text = "Archive board Acme, then Beta."
+    tagged = [("Archive", "O"), ("board", "O"), ("Acme", "B-ORG"), (",", "O"), ("then", "O"), ("Beta", "B-ORG"),
+              (".", "O")]
+    assert entities(text, tagged) == [("Acme", "ORG"), ("Beta", "ORG")]
+
+
+def test_word_pieces_extend_the_entity():
+    text = "Create board Roadmapping now"
+    tagged = [("Create", "O"), ("board", "O"), ("Road", "B-ORG"), ("##map", "O"), ("##ping", "O"), ("now", "O")]
+    assert entities(text, tagged) == [("Roadmapping", "ORG")]
+
+
+def test_inside_tags_join_words():
+    text = "Show Acme Corp boards"
+    tagged = [("Show", "O"), ("Acme", "B-ORG"), ("Corp", "I-ORG"), ("boards", "O")]
+    assert entities(text, tagged) == [("Acme Corp", "ORG")]
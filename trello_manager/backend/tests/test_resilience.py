@@ -0,0 +1,65 @@
+import pytest
+import requests
+
+from resilience import TIMEOUTS, CircuitBreaker, CircuitOpen, Upstream, endpoint_of
+
+
+class FakeSession:
+    """Answers requests from a list of outcomes: an exception to raise or a status code."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def request(self, method, url, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        return response
+
+
+def test_endpoint_of_replaces_ids():
+    assert endpoint_of("https://api.trello.com/1/boards/5f1a0c0e8b1d2a3c4d5e6f70/lists") == "/boards/:id/lists"
+
+
+def test_endpoint_of_drops_trailing_slash():
+    assert endpoint_of("https://api.trello.com/1/boards/") == "/boards"
+    assert endpoint_of("https://api.trello.com/1/") == "/"
+
+
+def test_board_copy_gets_its_own_timeout():
+    upstream = Upstream()
+    _, read_timeout = upstream.timeout("POST", endpoint_of("https://api.trello.com/1/boards/"))
+    assert read_timeout == TIMEOUTS["POST /boards"] == 30
+
+
+def test_other_posts_get_the_method_timeout():
+    upstream = Upstream()
+    _, read_timeout = upstream.timeout("POST", endpoint_of("https://api.trello.com/1/cards"))
+    assert read_timeout == TIMEOUTS["POST"]
+
+
+def test_failed_trial_of_any_kind_reopens_the_breaker():
+    upstream = Upstream()
+    upstream.breaker = CircuitBreaker(failures=1, reset_seconds=0)
+    session = FakeSession([requests.ConnectionError(), requests.exceptions.ChunkedEncodingError(), 200])
+    upstream.session = lambda token: session
+
+    with pytest.raises(requests.ConnectionError):
+        upstream.post("https://api.trello.com/1/cards")
+    # The half-open trial fails with something other than a timeout or connection error
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        upstream.post("https://api.trello.com/1/cards")
+    assert upstream.post("https://api.trello.com/1/cards").status_code == 200
+    assert upstream.breaker.state == "closed"
+
+
+def test_open_breaker_rejects_calls():
+    upstream = Upstream()
+    upstream.breaker = CircuitBreaker(failures=1, reset_seconds=60)
+    upstream.session = lambda token: FakeSession([requests.ConnectionError()])
+    with pytest.raises(requests.ConnectionError):
+        upstream.post("https://api.trello.com/1/cards")
+    with pytest.raises(CircuitOpen):
+        upstream.post("https://api.trello.com/1/cards")
@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import hmac
+
+import orjson
+
+from bulk import send
+from resilience import trello
+
+TRELLO_URL = "https://api.trello.com/1"
+
+# Updates can be patched into cached bodies in place, unless they change one of STRUCTURAL_FIELDS
+PATCHABLE_ACTIONS = {"updateBoard", "updateList", "updateCard"}
+
+# Changing these moves an object into or out of a cached collection, or to another place in its order
+STRUCTURAL_FIELDS = {"idList", "idBoard", "closed", "pos"}
+
+
+def verify_signature(secret, body, callback_url, signature):
+    """Check Trello's X-Trello-Webhook header: base64 HMAC-SHA1 of the raw body plus the callback URL."""
+    if not secret or not signature:
+        return False
+    digest = hmac.new(secret.encode(), body + callback_url.encode(), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+
+def register_webhooks(callback_url, model_ids, auth, limiter):
+    """Make sure a webhook to callback_url exists for every model id.
+
+    Registrations are paced by the account's rate limiter; one that fails doesn't stop the rest.
+    Returns the ids newly registered and the failures as [{"id", "error"}].
+    """
+    response = trello.get(f"{TRELLO_URL}/tokens/{auth['token']}/webhooks", params=auth)
+    if response.status_code != 200:
+        raise Exception(f"Failed to list Trello webhooks. {response.text}")
+    existing = {hook["idModel"] for hook in orjson.loads(response.content) if hook["callbackURL"] == callback_url}
+
+    registered, failed = [], []
+    for model_id in model_ids:
+        if model_id in existing:
+            continue
+        params = {"callbackURL": callback_url, "idModel": model_id, "description": "Trello manager cache", **auth}
+        try:
+            response = send("POST", f"{TRELLO_URL}/webhooks", params, limiter)
+        except Exception as e:
+            failed.append({"id": model_id, "error": str(e)})
+            continue
+        if response.status_code != 200:
+            failed.append({"id": model_id, "error": response.text})
+            continue
+        registered.append(model_id)
+    return registered, failed
+
+
+def apply_action(cache, action):
+    """Patch or invalidate exactly the cached bodies a Trello action changes."""
+    data = action.get("data", {})
+    action_type = action.get("type", "")
+    board = data.get("board", {}).get("id")
+    in_place = action_type in PATCHABLE_ACTIONS and not STRUCTURAL_FIELDS & set(data.get("old", {}))
+
+    if "card" in data and "Card" in action_type:
+        card = data["card"]
+        lists = {data[name]["id"] for name in ("list", "listBefore", "listAfter") if data.get(name)}
+        cache.invalidate(f"card:{card['id']}")
+        if in_place:
+            for list_id in lists:
+                cache.patch(f"list:{list_id}", card)
+        else:
+            cache.invalidate(*(f"list:{list_id}" for list_id in lists))
+    elif "list" in data and "List" in action_type:
+        if in_place and board:
+            cache.patch(f"board:{board}", data["list"])
+        elif board:
+            cache.invalidate(f"board:{board}")
+        # The boards-with-lists lookup behind list name resolution depends on lists too
+        cache.invalidate("member")
+    elif "board" in data and "Board" in action_type:
+        if in_place:
+            cache.patch("member", data["board"])
+        else:
+            cache.invalidate("member", f"board:{board}")